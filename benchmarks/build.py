@@ -0,0 +1,308 @@
+"""Build benchmarks over synthetic blogs of various sizes.
+
+Generates a blog with N posts (realistic frontmatter, tags, code fences,
+footnotes) next to a copy of the real static folder and data files, and
+times these scenarios through `Builder`:
+
+- cold: empty cache and output folder
+- noop: nothing changed
+- edit_post: the body of one post changed
+- edit_template: the post template changed
+- rename_tag: a tag used by several posts was renamed
+
+Social preview images are skipped unless --with-social is passed,
+--low-memory builds in low memory mode.  The results are written as JSON
+and can be compared with an earlier run.
+
+Usage: python benchmarks/build.py [--sizes 1000,10000,50000]
+           [--output results.json] [--compare earlier.json] [--low-memory]
+"""
+
+import argparse
+import json
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from jinja2 import FileSystemLoader
+
+from generator.builder import Builder
+
+REPO_FOLDER = Path(__file__).resolve().parent.parent
+BLOG_FOLDER = REPO_FOLDER / "blog"
+TEMPLATE_FOLDER = REPO_FOLDER / "generator" / "templates"
+
+WORDS = [
+    "the",
+    "of",
+    "and",
+    "to",
+    "in",
+    "is",
+    "that",
+    "for",
+    "it",
+    "as",
+    "with",
+    "was",
+    "on",
+    "be",
+    "by",
+    "this",
+    "are",
+    "at",
+    "from",
+    "code",
+    "python",
+    "rust",
+    "async",
+    "runtime",
+    "memory",
+    "type",
+    "system",
+    "compiler",
+    "library",
+    "error",
+    "handling",
+    "performance",
+    "thread",
+    "process",
+    "socket",
+    "request",
+    "response",
+    "design",
+    "api",
+    "module",
+    "function",
+    "value",
+    "trait",
+    "macro",
+    "interpreter",
+    "open",
+    "source",
+    "community",
+    "maintainer",
+    "project",
+    "release",
+    "version",
+    "dependency",
+    "build",
+    "test",
+]
+
+CODE_SAMPLES = {
+    "python": "def {name}(value):\n    if value is None:\n        return []\n"
+    "    return [x * 2 for x in value if x > 0]\n",
+    "rust": "fn {name}(value: &[u32]) -> Vec<u32> {{\n"
+    "    value.iter().filter(|x| **x > 0).map(|x| x * 2).collect()\n}}\n",
+    "javascript": "function {name}(value) {{\n"
+    "  return value.filter(x => x > 0).map(x => x * 2);\n}}\n",
+    "sql": "SELECT id, name FROM {name} WHERE created_at > now() - interval '1 day';\n",
+    "text": "$ cargo run --bin {name}\n   Compiling {name} v0.1.0\n",
+}
+
+
+def sentence(rng, min_words=6, max_words=18):
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize() + "."
+
+
+def paragraph(rng):
+    return "\n".join(sentence(rng) for _ in range(rng.randint(2, 6)))
+
+
+def make_post(rng, index, tags):
+    """Source of a single synthetic post."""
+    post_tags = sorted(set(rng.choices(tags, k=rng.randint(0, 4))))
+    lines = [
+        "---",
+        f"tags: {json.dumps(post_tags)}",
+        f"summary: {json.dumps(sentence(rng, 8, 25))}",
+        "---",
+        "",
+        f"# {sentence(rng, 3, 9)[:-1]} {index}",
+        "",
+    ]
+    footnotes = []
+    for _ in range(rng.randint(4, 20)):
+        roll = rng.random()
+        if roll < 0.15:
+            language = rng.choice(list(CODE_SAMPLES))
+            code = CODE_SAMPLES[language].format(name=f"item_{index}")
+            lines += [f"```{language}", code.rstrip("\n"), "```", ""]
+        elif roll < 0.25:
+            lines += [f"## {sentence(rng, 2, 6)[:-1]}", ""]
+        elif roll < 0.32:
+            lines += [f"* {sentence(rng, 3, 10)}" for _ in range(rng.randint(2, 5))]
+            lines.append("")
+        elif roll < 0.4:
+            footnotes.append(sentence(rng))
+            lines += [f"{paragraph(rng)}[^{len(footnotes)}]", ""]
+        else:
+            lines += [paragraph(rng), ""]
+    for number, text in enumerate(footnotes, 1):
+        lines.append(f"[^{number}]: {text}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_corpus(folder, size, seed=42):
+    """Generate a synthetic blog with `size` posts."""
+    rng = random.Random(seed)
+    tags = [f"{rng.choice(WORDS)}-{n}" for n in range(max(20, size // 50))]
+    shutil.copytree(BLOG_FOLDER / "static", folder / "static")
+    for name in ("events.yaml", "talks.yaml", "about.md", "projects.md"):
+        shutil.copy(BLOG_FOLDER / name, folder / name)
+
+    start = date(2007, 1, 1)
+    posts = []
+    for index in range(size):
+        day = start + timedelta(days=rng.randint(0, 365 * 19))
+        path = (
+            folder
+            / "posts"
+            / str(day.year)
+            / f"{day.month:02d}-{day.day:02d}-post-{index}.md"
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(make_post(rng, index, tags), encoding="utf-8")
+        posts.append(path)
+    return posts
+
+
+def most_common_tag(posts):
+    """Find a tag that is used by several posts."""
+    counts = {}
+    for path in posts[:500]:
+        header = path.read_text(encoding="utf-8").split("\n", 3)[1]
+        for tag in json.loads(header[len("tags: ") :]):
+            counts[tag] = counts.get(tag, 0) + 1
+    return max(counts, key=counts.get)
+
+
+def run_build(folder, templates, with_social, low_memory):
+    """Build the blog with a fresh builder, returns timing and counters."""
+    start = time.perf_counter()
+    builder = Builder(folder, low_memory=low_memory)
+    builder.jinja_env.loader = FileSystemLoader([str(templates)])
+    if not with_social:
+        builder.generate_social_previews = lambda: None
+    builder.build()
+    seconds = time.perf_counter() - start
+    report = builder.profiler.report()
+    return {
+        "seconds": seconds,
+        "cpu": report["total"]["cpu"],
+        "max_rss": report["max_rss"],
+        "outputs_rebuilt": report["counters"].get("outputs_rebuilt", 0),
+        "bytes_written": report["bytes_written"],
+    }
+
+
+def run_size(size, with_social, low_memory):
+    """Run all scenarios for a corpus of the given size."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="blog-bench-") as tmp:
+        folder = Path(tmp) / "blog"
+        templates = Path(tmp) / "templates"
+        shutil.copytree(TEMPLATE_FOLDER, templates)
+        print(f"Generating {size} posts...")
+        posts = generate_corpus(folder, size)
+
+        def scenario(name, change=None):
+            if change is not None:
+                change()
+            print(f"  {name}...", end=" ", flush=True)
+            result = run_build(folder, templates, with_social, low_memory)
+            print(f"{result['seconds']:.3f}s ({result['outputs_rebuilt']} outputs)")
+            results.append(dict(result, size=size, scenario=name))
+
+        def edit_post():
+            path = posts[len(posts) // 2]
+            with path.open("a", encoding="utf-8") as f:
+                f.write("\nAnother paragraph added by the benchmark.\n")
+
+        def edit_template():
+            path = templates / "content_display.html"
+            with path.open("a", encoding="utf-8") as f:
+                f.write("\n{# edited by the benchmark #}\n")
+
+        def rename_tag():
+            tag = most_common_tag(posts)
+            for path in posts:
+                source = path.read_text(encoding="utf-8")
+                renamed = source.replace(f'"{tag}"', f'"{tag}-renamed"', 1)
+                if renamed != source:
+                    path.write_text(renamed, encoding="utf-8")
+
+        scenario("cold")
+        scenario("noop")
+        scenario("edit_post", edit_post)
+        scenario("edit_template", edit_template)
+        scenario("rename_tag", rename_tag)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_FOLDER,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(results, baseline):
+    """Print the results next to the ones of an earlier run."""
+    earlier = {(r["size"], r["scenario"]): r for r in baseline["results"]}
+    print(f"\nCompared to {baseline.get('revision') or 'earlier run'}:")
+    for result in results:
+        before = earlier.get((result["size"], result["scenario"]))
+        if before is None:
+            continue
+        ratio = result["seconds"] / before["seconds"] if before["seconds"] else 0
+        print(
+            f"  {result['size']:>6} {result['scenario']:<14} "
+            f"{before['seconds']:9.3f}s -> {result['seconds']:9.3f}s  ({ratio:.2f}x)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", metavar="FILE")
+    parser.add_argument("--with-social", action="store_true")
+    parser.add_argument("--low-memory", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(x) for x in args.sizes.split(",")]:
+        results.extend(run_size(size, args.with_social, args.low_memory))
+
+    data = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "low_memory": args.low_memory,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    print(f"Wrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
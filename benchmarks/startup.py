@@ -0,0 +1,119 @@
+"""Startup benchmark for a build with nothing to do.
+
+Copies the blog into a temporary folder, builds it once and then runs
+`build-blog` in fresh processes without changing anything.  Reports the
+wall time of every run and fails if the median is over the budget or if
+one of the modules a no-op build should not need was imported.
+
+Usage: python benchmarks/startup.py [--runs 5] [--budget 1.0]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_FOLDER = Path(__file__).resolve().parent.parent
+BLOG_FOLDER = REPO_FOLDER / "blog"
+
+# Modules that are only needed to render or to serve
+HEAVY_MODULES = [
+    "PIL",
+    "asyncio",
+    "marko",
+    "multiprocessing",
+    "pygments",
+    "smartypants",
+    "watchdog",
+]
+
+RUN_BUILD = f"""
+import sys
+from generator.commands import main_build
+sys.argv = ["build-blog"]
+main_build()
+heavy = {HEAVY_MODULES!r}
+imported = sorted(m for m in heavy if m in sys.modules)
+print("IMPORTED " + ",".join(imported), file=sys.stderr)
+"""
+
+
+def run_build(folder):
+    """Run build-blog in a new process, returns wall time and heavy imports."""
+    env = dict(os.environ, PYTHONPATH=str(REPO_FOLDER))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", RUN_BUILD],
+        cwd=folder,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    seconds = time.perf_counter() - start
+    imported = []
+    for line in result.stderr.splitlines():
+        if line.startswith("IMPORTED "):
+            imported = [x for x in line[len("IMPORTED ") :].split(",") if x]
+    return seconds, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget", type=float, default=1.0, help="Maximum median seconds."
+    )
+    parser.add_argument("--output", metavar="FILE")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="blog-startup-") as tmp:
+        folder = Path(tmp) / "blog"
+        shutil.copytree(
+            BLOG_FOLDER,
+            folder,
+            ignore=shutil.ignore_patterns("_build", ".generator_cache"),
+        )
+        print("Initial build...")
+        run_build(folder)
+
+        times = []
+        imported = set()
+        for n in range(args.runs):
+            seconds, heavy = run_build(folder)
+            times.append(seconds)
+            imported.update(heavy)
+            print(f"  run {n + 1}: {seconds * 1000:.0f}ms")
+
+    median = statistics.median(times)
+    print(
+        f"Median no-op build: {median * 1000:.0f}ms (budget {args.budget * 1000:.0f}ms)"
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"times": times, "median": median, "imported": sorted(imported)},
+                f,
+                indent=2,
+            )
+            f.write("\n")
+
+    failed = False
+    if imported:
+        print(f"Imported although nothing was rendered: {', '.join(sorted(imported))}")
+        failed = True
+    if median > args.budget:
+        print("Over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
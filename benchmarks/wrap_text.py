@@ -0,0 +1,114 @@
+"""Micro-benchmark for the text layout of social preview images.
+
+Wraps the titles and summaries of all posts with the fonts and widths used
+for the preview images, once with the original implementation that
+measures the whole growing line for every word and once with `TextLayout`.
+Fails if any line break or line height differs.
+
+Usage: python benchmarks/wrap_text.py [project_folder]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from generator.builder import Builder
+
+
+def legacy_wrap_text(text, font, max_width):
+    """The original quadratic implementation of `_wrap_text`."""
+    if not text:
+        return []
+
+    dummy_img = Image.new("RGB", (1, 1))
+    dummy_draw = ImageDraw.Draw(dummy_img)
+
+    words = text.split()
+    if not words:
+        return []
+
+    lines = []
+    current_line = []
+
+    for word in words:
+        test_line = " ".join(current_line + [word])
+        bbox = dummy_draw.textbbox((0, 0), test_line, font=font)
+        width = bbox[2] - bbox[0]
+
+        if width <= max_width or not current_line:
+            current_line.append(word)
+        else:
+            if current_line:
+                lines.append(" ".join(current_line))
+            current_line = [word]
+
+    if current_line:
+        lines.append(" ".join(current_line))
+
+    return lines
+
+
+def legacy_text_height(text, font):
+    """The original implementation of `_get_text_height`."""
+    dummy_img = Image.new("RGB", (1, 1))
+    dummy_draw = ImageDraw.Draw(dummy_img)
+    bbox = dummy_draw.textbbox((0, 0), text, font=font)
+    return bbox[3] - bbox[1]
+
+
+def collect_jobs(gen, posts):
+    """(text, font) pairs exactly as `_generate_preview` lays them out."""
+    jobs = []
+    for post in posts:
+        jobs.append((post.title, gen._select_title_font(post.title)))
+        if post.summary:
+            size = "body" if len(post.summary) <= 100 else "body_small"
+            jobs.append((post.summary, gen.fonts[size]))
+    return jobs
+
+
+def run(wrap, height, jobs, max_width):
+    start = time.perf_counter()
+    results = []
+    for text, font in jobs:
+        lines = wrap(text, font, max_width)
+        results.append([(line, height(line, font)) for line in lines])
+    return time.perf_counter() - start, results
+
+
+def main():
+    project_folder = Path(sys.argv[1] if len(sys.argv) > 1 else "blog")
+    builder = Builder(project_folder)
+    builder.scan_content()
+    gen = builder.social_gen
+    posts = [post for post in builder.posts if post.title and post.pub_date]
+    jobs = collect_jobs(gen, posts)
+
+    legacy_time, expected = run(
+        legacy_wrap_text, legacy_text_height, jobs, gen.content_width
+    )
+    cold_time, actual = run(
+        gen._wrap_text, gen._get_text_height, jobs, gen.content_width
+    )
+    warm_time, _ = run(gen._wrap_text, gen._get_text_height, jobs, gen.content_width)
+
+    mismatches = [
+        (text, want, got)
+        for (text, _), want, got in zip(jobs, expected, actual)
+        if want != got
+    ]
+    print(f"{len(jobs)} texts from {len(posts)} posts")
+    print(f"legacy:            {legacy_time * 1000:8.1f} ms")
+    print(f"layout (cold):     {cold_time * 1000:8.1f} ms")
+    print(f"layout (cached):   {warm_time * 1000:8.1f} ms")
+    for text, want, got in mismatches:
+        print(f"MISMATCH: {text!r}\n  expected {want}\n  got      {got}")
+    if mismatches:
+        sys.exit(1)
+    print("All line breaks and line heights are identical")
+
+
+if __name__ == "__main__":
+    main()
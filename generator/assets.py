@@ -0,0 +1,129 @@
+import hashlib
+import posixpath
+import re
+import sqlite3
+
+# Number of hex digits of the content hash in fingerprinted file names
+FINGERPRINT_LENGTH = 10
+
+_css_url_re = re.compile(r"""url\(\s*(['"]?)([^'")\s]+)\1\s*\)""")
+
+
+def fingerprinted_name(name, digest):
+    """Insert a content hash into a file name (`style.css` -> `style.<hash>.css`)."""
+    folder, _, filename = name.rpartition("/")
+    stem, dot, ext = filename.rpartition(".")
+    if not stem:
+        stem, dot, ext = filename, "", ""
+    filename = f"{stem}.{digest[:FINGERPRINT_LENGTH]}{dot}{ext}"
+    return f"{folder}/{filename}" if folder else filename
+
+
+class StaticAssets:
+    """Content-addressed copies of the files in the static folder.
+
+    Every file is published under its own name (posts and other sites link
+    to those) and under a fingerprinted name containing a hash of its
+    contents, which templates link to with `asset_url` and which can be
+    cached forever.  URLs in stylesheets are rewritten to the fingerprinted
+    names, so a stylesheet's hash changes when something it uses changes.
+    """
+
+    def __init__(self, static_folder, store):
+        self.static_folder = static_folder
+        self.url_prefix = f"/{static_folder.name}/"
+        self.hashes = store.table("static_files")
+        self.files = {}
+        self.manifest = {}
+
+    def _hash_file(self, name, path):
+        """Hash of a static file, only read if its stat record changed."""
+        stat = path.stat()
+        record = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+        entry = self.hashes.get(name)
+        if entry is not None and entry["stat"] == record:
+            return entry["hash"]
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        self.hashes[name] = {"stat": record, "hash": digest}
+        return digest
+
+    def _rewrite_css(self, name, data):
+        """Point URLs in a stylesheet to fingerprinted files."""
+        folder = posixpath.dirname(name)
+
+        def replace(match):
+            quote, url = match.groups()
+            if url.startswith(self.url_prefix):
+                target = url[len(self.url_prefix) :]
+            elif "://" in url or url.startswith(("/", "data:", "#")):
+                return match.group(0)
+            else:
+                target = posixpath.normpath(posixpath.join(folder, url))
+            fingerprinted = self.manifest.get(target)
+            if fingerprinted is None or target.endswith(".css"):
+                return match.group(0)
+            if url.startswith(self.url_prefix):
+                new_url = self.url_prefix + fingerprinted
+            else:
+                new_url = posixpath.relpath(fingerprinted, folder or ".")
+            return f"url({quote}{new_url}{quote})"
+
+        return _css_url_re.sub(replace, data.decode("utf-8")).encode("utf-8")
+
+    def scan(self, generated=None):
+        """Hash all static files and build the manifest.
+
+        `generated` maps names of generated assets to their contents.
+        """
+        self.files = {}
+        self.manifest = {}
+        sources = {}
+        stylesheets = []
+        if self.static_folder.is_dir():
+            for path in sorted(self.static_folder.rglob("*")):
+                if path.is_file():
+                    sources[path.relative_to(self.static_folder).as_posix()] = path
+        for name in set(self.hashes.keys()) - set(sources):
+            self.hashes.pop(name)
+
+        for name, path in sources.items():
+            if name.endswith(".css"):
+                stylesheets.append((name, path, path.read_bytes()))
+                continue
+            digest = self._hash_file(name, path)
+            self.manifest[name] = fingerprinted_name(name, digest)
+            self.files[name] = self.files[self.manifest[name]] = (path, None, digest)
+        for name, data in (generated or {}).items():
+            stylesheets.append((name, None, data))
+
+        # Stylesheets last, so that their URLs can be rewritten
+        for name, path, data in stylesheets:
+            self.files[name] = (
+                path,
+                data if path is None else None,
+                hashlib.sha256(data).hexdigest(),
+            )
+            rewritten = self._rewrite_css(name, data)
+            digest = hashlib.sha256(rewritten).hexdigest()
+            self.manifest[name] = fingerprinted_name(name, digest)
+            self.files[self.manifest[name]] = (None, rewritten, digest)
+
+    def outputs(self):
+        """Yield `(name, path, data, hash)` of every file to publish.
+
+        Files with `data` of `None` are copied from `path` as they are.
+        """
+        for name in sorted(self.files):
+            path, data, digest = self.files[name]
+            yield name, path, data, digest
+
+    def save(self):
+        """Write the file hashes to disk."""
+        try:
+            self.hashes.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not save static file hashes: {e}")
+
+    def url(self, name):
+        """URL of the fingerprinted copy of a static file."""
+        return self.url_prefix + self.manifest.get(name, name)
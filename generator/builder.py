@@ -1,95 +1,167 @@
 import os
 import re
-import shutil
+import sqlite3
+import time
 import json
 import hashlib
 import yaml
 from datetime import datetime, timezone, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from fnmatch import fnmatch
+from importlib import metadata
 from math import log, ceil
 from pathlib import Path
+from threading import RLock
 
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import FileSystemBytecodeCache, FileSystemLoader
+from markupsafe import Markup
 
 from generator.pagination import Pagination
+from generator.profiler import BuildProfiler
+from generator.assets import StaticAssets
+from generator.cachestore import CacheStore
+from generator.compress import COMPRESSED_SUFFIXES, Precompressor
 from generator.config import CONFIG
+from generator.depgraph import (
+    DependencyGraph,
+    DependencyTrackingEnvironment,
+    hash_value,
+)
 from generator.markup import (
-    extract_title_from_content,
+    HighlightCache,
+    find_title_source,
     render_markdown,
     render_summary,
     get_pygments_css,
+    get_renderer_fingerprint,
+    render_title,
+    set_highlight_cache,
 )
 from generator.social_preview import SocialPreviewGenerator
+from generator.writer import UNTOUCHED, OutputWriter
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML without libyaml
+    from yaml import SafeLoader as YamlLoader
 
 
 PDF_HOST = "https://raw.githubusercontent.com/mitsuhiko/talks/main/pdfs/"
 
+# Generator modules whose code affects what the outputs look like
+OUTPUT_MODULES = (
+    "assets.py",
+    "builder.py",
+    "config.py",
+    "lexers.py",
+    "marko_renderer.py",
+    "markup.py",
+    "pagination.py",
+)
+
+# Posts that are read or rendered at a time with `low_memory`
+LOW_MEMORY_BATCH_SIZE = 64
+
+
+def split_frontmatter(content):
+    """Split a content file into its YAML frontmatter and the body.
+
+    Only the header is scanned line by line, the body is sliced off as
+    a whole.
+    """
+    end = content.find("\n")
+    if end == -1 or content[:end].strip() != "---":
+        return "", content
+    header_start = pos = end + 1
+    while True:
+        end = content.find("\n", pos)
+        line = content[pos:] if end == -1 else content[pos:end]
+        if line.strip() == "---":
+            body = "" if end == -1 else content[end + 1 :]
+            return content[header_start:pos], body
+        if end == -1:
+            return "", content
+        pos = end + 1
+
 
 class BlogPost:
-    """Represents a single blog post."""
+    """Represents a single blog post.
+
+    Parsing is kept to a minimum: only the frontmatter is parsed up front,
+    the title is rendered and the body read from disk when first needed.
+    """
+
+    __slots__ = (
+        "_content",
+        # Memoized (source, rendered) pairs so that the post page and all the
+        # feeds a post appears in share one rendered fragment per build.
+        "_content_memo",
+        "_summary_memo",
+        "_title",
+        "builder",
+        "file_type",
+        "pub_date",
+        "source_path",
+        "summary",
+        "tags",
+        "title_source",
+    )
 
     def __init__(self, source_path, content, builder):
         self.source_path = source_path
         self.builder = builder
-        self.title = "Untitled"
-        self.summary = None
-        self.pub_date = None
-        self.tags = []
-
-        # Determine file type
         self.file_type = "markdown"
+        self._title = None
+        self._content_memo = None
+        self._summary_memo = None
 
-        # Parse content
-        self._parse_content(content)
-
-        # Extract date from path if not in frontmatter
-        if self.pub_date is None:
-            self._extract_date_from_path()
-
-    def _parse_content(self, content):
-        """Parse frontmatter based on file type."""
-        frontmatter, content_start = self._parse_yaml_frontmatter(content)
-
-        # Apply frontmatter
+        header, self._content = split_frontmatter(content)
+        frontmatter = (yaml.load(header, Loader=YamlLoader) or {}) if header else {}
         self.tags = frontmatter.get("tags", [])
         self.summary = frontmatter.get("summary")
+        # Markdown source of the title, rendered when `title` is first used
+        self.title_source = find_title_source(self._content)
+        self.pub_date = self._extract_date_from_path()
 
-        # Parse content for title if not in frontmatter
-        lines = content.split("\n")
-        self.content = "\n".join(lines[content_start:])
-
-        extracted_title = extract_title_from_content(self.content)
-        if extracted_title:
-            self.title = extracted_title
-
-    def _parse_yaml_frontmatter(self, content):
-        """Parse YAML frontmatter (for .md files)."""
-        lines = content.split("\n")
-        frontmatter = {}
-        content_start = 0
-
-        # Check for YAML frontmatter delimited by ---
-        if lines and lines[0].strip() == "---":
-            yaml_lines = []
-            for i, line in enumerate(lines[1:], 1):
-                if line.strip() == "---":
-                    content_start = i + 1
-                    break
-                yaml_lines.append(line)
-
-            if yaml_lines:
-                yaml_content = "\n".join(yaml_lines)
-                frontmatter = yaml.safe_load(yaml_content) or {}
+    @property
+    def title(self):
+        """Plain text title from the first heading of the post."""
+        if self._title is None:
+            if self.title_source is None:
+                self._title = "Untitled"
+            else:
+                self._title = render_title(self.title_source)
+            self.builder.content_cache.cache_title(
+                self.source_path, self.title_source, self._title
+            )
+        return self._title
 
-        return frontmatter, content_start
+    @property
+    def content(self):
+        """The Markdown body of the post (without frontmatter)."""
+        if self._content is None:
+            path = self.builder.project_folder / self.source_path
+            self._content = split_frontmatter(path.read_text(encoding="utf-8"))[1]
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+
+    def release(self):
+        """Drop the body and rendered HTML, they are loaded again if needed."""
+        self._content = None
+        self._content_memo = None
+        self._summary_memo = None
 
     def _extract_date_from_path(self):
         """Extract publication date from file path."""
         match = re.search(r"posts/(\d{4})/(\d{2})-(\d{2})-", self.source_path)
         if match:
             year, month, day = match.groups()
-            self.pub_date = datetime(int(year), int(month), int(day))
+            return datetime(int(year), int(month), int(day))
+        return None
 
     @property
     def slug(self):
@@ -110,21 +182,65 @@ class BlogPost:
         """Output file path."""
         slug = self.slug.strip("/")
         if not slug:
-            return str(Path(CONFIG["output_folder"]) / "index.html")
-        return str(Path(CONFIG["output_folder"]) / slug / "index.html")
+            return str(self.builder.output_folder / "index.html")
+        return str(self.builder.output_folder / slug / "index.html")
 
     def render_content(self):
         """Render content based on file type."""
-        return render_markdown(self.content)
+        if self._content_memo is not None and self._content_memo[0] is self.content:
+            return self._content_memo[1]
+        self.builder.render_counts[self.source_path] += 1
+        cache = self.builder.content_cache
+        rv = cache.get_rendered(self.source_path, "content", self.content)
+        if rv is not None:
+            self.builder.profiler.count("render_cache_hits")
+        else:
+            self.builder.profiler.count("render_cache_misses")
+            rv = render_markdown(self.content)
+            cache.cache_rendered(self.source_path, "content", self.content, rv)
+        self._content_memo = (self.content, rv)
+        return rv
 
     def render_summary(self):
         """Render summary as HTML."""
-        return render_summary(self.summary)
+        if not self.summary:
+            return render_summary(self.summary)
+        if self._summary_memo is not None and self._summary_memo[0] is self.summary:
+            return self._summary_memo[1]
+        cache = self.builder.content_cache
+        rv = cache.get_rendered(self.source_path, "summary", self.summary)
+        if rv is None:
+            rv = render_summary(self.summary)
+            cache.cache_rendered(self.source_path, "summary", self.summary, rv)
+        self._summary_memo = (self.summary, rv)
+        return rv
+
+    def listing_metadata(self):
+        """Metadata shown wherever the post is listed (indexes, archives, tags).
+
+        The title is included as Markdown source, so fingerprinting this
+        doesn't need to render it.
+        """
+        return {
+            "title": self.title_source,
+            "summary": self.summary,
+            "pub_date": self.pub_date.isoformat() if self.pub_date else None,
+            "tags": self.tags,
+            "slug": self.slug,
+        }
 
     def to_metadata(self):
-        """Extract metadata for caching (without complex objects)."""
+        """Extract metadata for caching (without complex objects).
+
+        The rendered title is only included if something already used it,
+        together with the renderer it was rendered with.
+        """
         return {
-            "title": self.title,
+            "title_source": self.title_source,
+            "title": self._title,
+            "title_renderer": (
+                get_renderer_fingerprint() if self._title is not None else None
+            ),
             "summary": self.summary,
             "pub_date": self.pub_date.isoformat() if self.pub_date else None,
             "tags": self.tags,
@@ -132,13 +248,33 @@ class BlogPost:
             "content": self.content,
         }
 
+    def use_rendered_content(self, content_data):
+        """Adopt content that was rendered elsewhere (e.g. in a worker process)."""
+        self.builder.render_counts[self.source_path] += 1
+        self.builder.content_cache.cache_rendered(
+            self.source_path, "content", self.content, content_data
+        )
+        self._content_memo = (self.content, content_data)
+
     @classmethod
-    def from_metadata(cls, source_path, metadata, builder, content):
-        """Create BlogPost from cached metadata, re-parsing content."""
+    def from_metadata(cls, source_path, metadata, builder, content=None):
+        """Create BlogPost from cached metadata, re-parsing content.
+
+        If the metadata carries the body (as returned by `to_metadata`) it
+        is used directly, otherwise the body is split off `content`.  If
+        neither is available the body is read from disk when first needed.
+        """
         post = cls.__new__(cls)
         post.source_path = source_path
         post.builder = builder
-        post.title = metadata["title"]
+        post.title_source = metadata["title_source"]
+        # A title rendered by another version of the renderer is rendered again
+        post._title = None
+        if metadata.get("title_renderer") == get_renderer_fingerprint():
+            post._title = metadata["title"]
+        post._content = None
+        post._content_memo = None
+        post._summary_memo = None
         post.summary = metadata["summary"]
         post.pub_date = (
             datetime.fromisoformat(metadata["pub_date"])
@@ -148,32 +284,45 @@ class BlogPost:
         post.tags = metadata["tags"]
         post.file_type = metadata["file_type"]
 
-        # Re-parse content to extract body (skip header)
-        post._parse_content(content)
+        # Only split off the header, the title is already known
+        if "content" in metadata:
+            post.content = metadata["content"]
+        elif content is not None:
+            post.content = split_frontmatter(content)[1]
         return post
 
 
 class ContentCache:
-    """Simplified content cache with reduced complexity."""
+    """Simplified content cache with reduced complexity.
 
-    def __init__(self, project_folder):
+    Besides the parsed metadata it also keeps the rendered HTML of every
+    file, keyed by a hash of the rendered source and the renderer
+    fingerprint, so unchanged posts never go through Markdown again.
+    """
+
+    def __init__(self, project_folder, store=None):
         self.project_folder = project_folder
-        self.cache_file = (
-            self.project_folder / ".generator_cache" / "content_cache.json"
-        )
-        self.cache_file.parent.mkdir(exist_ok=True)
-        self.cache = self._load_cache()
+        self.store = store or CacheStore(project_folder)
+        self.cache = self.store.table("content")
+        self.rendered = self.store.table("rendered", compress=True)
+
+    def get_cached_entry(self, filepath, stat):
+        """Get the cache entry of a file if its stat record is unchanged."""
+        entry = self.cache.get(filepath)
+        if entry is not None and entry.get("stat") == [
+            stat.st_mtime_ns,
+            stat.st_size,
+            stat.st_ino,
+        ]:
+            return entry
+        return None
 
-    def _load_cache(self):
-        """Load cache from disk."""
-        try:
-            return (
-                json.loads(self.cache_file.read_text())
-                if self.cache_file.exists()
-                else {}
-            )
-        except (json.JSONDecodeError, OSError):
-            return {}
+    def record_stat(self, filepath, stat, body):
+        """Remember the stat record and body hash of a file that was read."""
+        entry = self.cache[filepath]
+        entry["stat"] = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+        entry["body_hash"] = hashlib.sha256(body.encode()).hexdigest()
+        self.cache.mark_changed(filepath)
 
     def get_cached_metadata(self, filepath, content):
         """Get cached metadata if content unchanged, None if needs parsing."""
@@ -194,42 +343,148 @@ class ContentCache:
             "metadata": clean_metadata,
         }
 
+    def _render_key(self, source):
+        """Cache key for rendered HTML of the given source."""
+        h = hashlib.sha256(source.encode())
+        h.update(get_renderer_fingerprint().encode())
+        return h.hexdigest()
+
+    def get_rendered(self, filepath, kind, source):
+        """Get cached rendered HTML if source and renderer unchanged."""
+        entry = self.rendered.get(f"{kind}:{filepath}")
+        if entry is None or entry["key"] != self._render_key(source):
+            return None
+        value = entry["value"]
+        if isinstance(value, dict):
+            html_title = value["html_title"]
+            return {
+                "title": value["title"],
+                "html_title": Markup(html_title) if html_title is not None else None,
+                "fragment": Markup(value["fragment"]),
+            }
+        return Markup(value)
+
+    def cache_rendered(self, filepath, kind, source, value):
+        """Cache rendered HTML (a string or a `render_markdown` result)."""
+        if filepath not in self.cache:
+            return
+        if isinstance(value, dict):
+            value = {k: str(v) if v is not None else None for k, v in value.items()}
+        else:
+            value = str(value)
+        self.rendered[f"{kind}:{filepath}"] = {
+            "key": self._render_key(source),
+            "value": value,
+        }
+
+    def cache_title(self, filepath, title_source, title):
+        """Remember the rendered title of a file's metadata."""
+        entry = self.cache.get(filepath)
+        if entry is not None and entry["metadata"]["title_source"] == title_source:
+            entry["metadata"]["title"] = title
+            entry["metadata"]["title_renderer"] = get_renderer_fingerprint()
+            self.cache.mark_changed(filepath)
+
     def cleanup_deleted_files(self, existing_files):
         """Remove cache entries for files that no longer exist."""
         deleted = set(self.cache.keys()) - existing_files
         for filepath in deleted:
-            self.cache.pop(filepath, None)
+            self.remove_file(filepath)
         return deleted
 
+    def remove_file(self, filepath):
+        """Remove all cache entries of a single file."""
+        self.cache.pop(filepath, None)
+        for kind in ("content", "summary"):
+            self.rendered.pop(f"{kind}:{filepath}", None)
+
+    def release(self, filepath):
+        """Drop the rendered HTML of a file from memory (saving it first)."""
+        for kind in ("content", "summary"):
+            self.rendered.release(f"{kind}:{filepath}")
+
     def save(self):
-        """Save cache to disk."""
+        """Write changed entries to disk."""
         try:
-            self.cache_file.write_text(json.dumps(self.cache, indent=2, default=str))
-        except OSError as e:
+            self.cache.commit()
+            self.rendered.commit()
+        except sqlite3.Error as e:
             print(f"Warning: Could not save cache: {e}")
 
 
 class Builder:
     """Simplified blog builder without unnecessary abstractions."""
 
-    def __init__(self, project_folder=None):
+    def __init__(
+        self,
+        project_folder=None,
+        jobs=1,
+        output_store=None,
+        precompress=False,
+        prune=True,
+        prune_dry_run=False,
+        low_memory=False,
+        cache_store=None,
+    ):
         if project_folder is None:
             project_folder = os.getcwd()
         project_folder = Path(project_folder).resolve()
         self.project_folder = project_folder
         self.output_folder = project_folder / CONFIG["output_folder"]
+        self.jobs = jobs or os.cpu_count() or 1
+        # With an output store (see `MemoryOutputStore`) nothing but social
+        # preview images is written to disk and outputs render on demand.
+        self.output_store = output_store
+        self.lock = output_store.lock if output_store is not None else RLock()
+        # Write .gz/.br siblings of text outputs after every build
+        self.precompress = precompress and output_store is None
+        # Delete (or with `prune_dry_run` list) files a full build didn't produce
+        self.prune = prune and output_store is None
+        self.prune_dry_run = prune_dry_run
+        # Only keep metadata of posts around, bodies and rendered HTML are
+        # loaded for the outputs that need them and dropped right after
+        self.low_memory = low_memory and output_store is None
         self.posts = []
         self.pages = []
         self.tags = defaultdict(list)
-        self.content_cache = ContentCache(project_folder)
-        self.social_gen = SocialPreviewGenerator(project_folder)
-        self.on_page_rebuilt = None  # Callback for when individual pages are rebuilt
+        self.render_counts = Counter()  # Content renders per post in this build
+        self.changed_outputs = set()  # Keys of outputs (re)built in this build
+        self.profiler = BuildProfiler()
+        self.cache_store = cache_store or CacheStore(project_folder)
+        self.content_cache = ContentCache(project_folder, self.cache_store)
+        self.social_gen = SocialPreviewGenerator(project_folder, self.cache_store)
+        self.assets = StaticAssets(
+            project_folder / CONFIG["static_folder"], self.cache_store
+        )
+        self.precompressor = Precompressor(self.output_folder, self.cache_store)
+        self.writer = OutputWriter()
+        self.highlight_cache = HighlightCache(self.cache_store)
+        set_highlight_cache(self.highlight_cache)
         template_path = Path(__file__).parent / "templates"
-        self.jinja_env = Environment(
-            loader=FileSystemLoader([str(template_path)]), autoescape=True
+        # Compiled templates are kept in the bytecode cache (checked against
+        # a hash of the source) and in memory for the life of the builder.
+        # Changed templates are evicted at the start of every build instead
+        # of Jinja checking the file on every lookup.
+        bytecode_folder = project_folder / ".generator_cache" / "templates"
+        bytecode_folder.mkdir(parents=True, exist_ok=True)
+        self.jinja_env = DependencyTrackingEnvironment(
+            loader=FileSystemLoader([str(template_path)]),
+            autoescape=True,
+            auto_reload=False,
+            bytecode_cache=FileSystemBytecodeCache(str(bytecode_folder)),
+        )
+        self.templates = {}
+        self.deps = DependencyGraph(
+            project_folder,
+            self.output_folder,
+            self.jinja_env,
+            self.cache_store,
+            output_store,
         )
+        self.jinja_env.dependency_graph = self.deps
         self.jinja_env.globals.update(
             link_to=self._link_to,
+            asset_url=self._asset_url,
             format_date=self._format_date,
             get_recent_blog_entries=self._get_recent_posts,
             get_tags=self._get_tags,
@@ -261,6 +516,11 @@ class Builder:
             return "/tags/"
         return "/"
 
+    def _asset_url(self, name):
+        """URL of the fingerprinted copy of a static file."""
+        self.deps.add_input(f"asset:{name}")
+        return self.assets.url(name)
+
     def _format_date(self, date_obj=None, format="medium"):
         """Simple date formatting."""
         if date_obj is None:
@@ -316,6 +576,10 @@ class Builder:
         """Get today's date."""
         return datetime.now().date()
 
+    def _is_ignored_name(self, name):
+        """Check if a single file or directory name matches an ignore pattern."""
+        return any(fnmatch(name, pattern) for pattern in CONFIG["ignore_patterns"])
+
     def should_ignore(self, path):
         """Check if path should be ignored."""
         path_obj = Path(path)
@@ -323,11 +587,7 @@ class Builder:
             relative_path = path_obj.relative_to(self.project_folder)
         except ValueError:
             return True
-        for part in relative_path.parts:
-            for pattern in CONFIG["ignore_patterns"]:
-                if fnmatch(part, pattern):
-                    return True
-        return False
+        return any(self._is_ignored_name(part) for part in relative_path.parts)
 
     def load_travel_data(self):
         """Load travel data from events YAML file, filtering for travel type."""
@@ -336,7 +596,7 @@ class Builder:
         if events_file.exists():
             try:
                 with open(events_file, "r") as f:
-                    raw_data = yaml.safe_load(f)
+                    raw_data = yaml.load(f, Loader=YamlLoader)
                     for item in raw_data:
                         # Only include events with type "travel"
                         if item.get("type") == "travel":
@@ -352,7 +612,7 @@ class Builder:
         talks_data = []
         if talks_file.exists():
             with open(talks_file, "r") as f:
-                raw_data = yaml.safe_load(f)
+                raw_data = yaml.load(f, Loader=YamlLoader)
                 if raw_data:
                     for item in raw_data:
                         pdf = item.get("links", {}).get("pdf")
@@ -362,63 +622,325 @@ class Builder:
 
         return talks_data
 
+    def _iter_content_files(self):
+        """Yield content files, pruning ignored directories before descending."""
+        for dirpath, dirnames, filenames in os.walk(self.project_folder):
+            dirnames[:] = sorted(d for d in dirnames if not self._is_ignored_name(d))
+            for filename in sorted(filenames):
+                if filename.endswith(".md") and not self._is_ignored_name(filename):
+                    yield Path(dirpath) / filename
+
+    def _load_post(self, rel_path, filepath):
+        """Read and parse a content file that changed since the last scan.
+
+        Runs on the scan thread pool, so it only reads from the cache.
+        """
+        content = filepath.read_text(encoding="utf-8")
+        cached_metadata = self.content_cache.get_cached_metadata(rel_path, content)
+        if cached_metadata:
+            return (
+                content,
+                BlogPost.from_metadata(rel_path, cached_metadata, self, content),
+                False,
+            )
+        return content, BlogPost(rel_path, content, self), True
+
     def scan_content(self):
-        """Scan for content files with caching for unchanged files."""
+        """Scan for content files with caching for unchanged files.
+
+        Files whose stat record (mtime, size, inode) matches the cache are
+        not opened at all, their body is only read if something needs it.
+        All other files are read and parsed on a thread pool.
+        """
         # Track existing files for deletion detection
         existing_files = set()
+        loaded = {}
+        changed = []
 
-        # Reset collections
+        for filepath in self._iter_content_files():
+            rel_path = str(filepath.relative_to(self.project_folder))
+            existing_files.add(rel_path)
+            try:
+                stat = filepath.stat()
+            except OSError as e:
+                print(f"Error processing {rel_path}: {e}")
+                continue
+            entry = self.content_cache.get_cached_entry(rel_path, stat)
+            if entry is not None:
+                self.profiler.count("content_stat_hits")
+                loaded[rel_path] = BlogPost.from_metadata(
+                    rel_path, entry["metadata"], self
+                )
+            else:
+                changed.append((rel_path, filepath, stat))
+
+        if changed:
+            with ThreadPoolExecutor() as pool:
+                for batch in self._batches(changed):
+                    futures = [
+                        pool.submit(self._load_post, rel_path, filepath)
+                        for rel_path, filepath, _ in batch
+                    ]
+                    for (rel_path, _, stat), future in zip(batch, futures):
+                        try:
+                            content, post, parsed = future.result()
+                        except Exception as e:
+                            print(f"Error processing {rel_path}: {e}")
+                            continue
+                        self._cache_loaded_post(rel_path, stat, content, post, parsed)
+                        if self.low_memory:
+                            post.release()
+                        loaded[rel_path] = post
+
+        for post in loaded.values():
+            self._register_fingerprints(post)
+        self._index_posts(loaded)
+
+        deleted_files = self.content_cache.cleanup_deleted_files(existing_files)
+        if deleted_files:
+            print(f"Removed {len(deleted_files)} deleted files from cache")
+
+        self.content_cache.save()
+
+    def _cache_loaded_post(self, rel_path, stat, content, post, parsed):
+        """Update the content cache after a file was read."""
+        self.profiler.count("content_files_read")
+        if parsed:
+            self.profiler.count("content_files_parsed")
+            self.content_cache.cache_metadata(rel_path, content, post.to_metadata())
+        self.content_cache.record_stat(rel_path, stat, post.content)
+
+    def _batches(self, items):
+        """Split work into small batches in low memory mode (else just one)."""
+        if not self.low_memory:
+            return [items] if items else []
+        size = LOW_MEMORY_BATCH_SIZE
+        return [items[i : i + size] for i in range(0, len(items), size)]
+
+    def _release_posts(self, posts):
+        """Drop bodies and rendered HTML of posts in low memory mode.
+
+        Highlighted code blocks are written to the cache and dropped too.
+        """
+        if self.low_memory:
+            for post in posts:
+                post.release()
+                self.content_cache.release(post.source_path)
+            self.highlight_cache.release()
+
+    def _index_posts(self, loaded):
+        """Rebuild the post, page and tag collections from loaded posts."""
         self.posts = []
         self.pages = []
         self.tags = defaultdict(list)
 
-        # Rebuild from cache and parse new/modified files
-        for filepath in self.project_folder.rglob("*"):
-            if (
-                filepath.is_file()
-                and not self.should_ignore(filepath)
-                and (filepath.suffix == ".md")
-            ):
-                rel_path = filepath.relative_to(self.project_folder)
-                existing_files.add(str(rel_path))
+        for rel_path in sorted(loaded):
+            post = loaded[rel_path]
+            if post.pub_date:
+                self.posts.append(post)
+                for tag in post.tags:
+                    self.tags[tag].append(post)
+            else:
+                self.pages.append(post)
 
-                try:
-                    content = filepath.read_text(encoding="utf-8")
-                    cached_metadata = self.content_cache.get_cached_metadata(
-                        str(rel_path), content
-                    )
+        self.posts.sort(key=lambda x: x.pub_date, reverse=True)
 
-                    if cached_metadata:
-                        post = BlogPost.from_metadata(
-                            str(rel_path), cached_metadata, self, content
-                        )
-                    else:
-                        post = BlogPost(str(rel_path), content, self)
-                        self.content_cache.cache_metadata(
-                            str(rel_path), content, post.to_metadata()
-                        )
-
-                    if post.pub_date:
-                        self.posts.append(post)
-                        for tag in post.tags:
-                            self.tags[tag].append(post)
-                    else:
-                        self.pages.append(post)
-
-                except Exception as e:
-                    print(f"Error processing {rel_path}: {e}")
+    def _register_fingerprints(self, post):
+        """Register the fingerprints of a post with the dependency graph."""
+        entry = self.content_cache.cache[post.source_path]
+        self.deps.set_fingerprint(f"source:{post.source_path}", entry["content_hash"])
+        self.deps.set_fingerprint(f"body:{post.source_path}", entry["body_hash"])
+        self.deps.set_fingerprint(
+            f"meta:{post.source_path}", hash_value(post.listing_metadata())
+        )
 
-        deleted_files = self.content_cache.cleanup_deleted_files(existing_files)
-        if deleted_files:
-            print(f"Removed {len(deleted_files)} deleted files from cache")
+    def _post_inputs(self, posts, kinds=("meta",)):
+        """Inputs for an output that lists the given posts."""
+        inputs = {}
+        for post in posts:
+            for kind in kinds:
+                key = f"{kind}:{post.source_path}"
+                inputs[key] = self.deps.fingerprint(key)
+        return inputs
+
+    def _write_output(self, output_path, data):
+        """Write a generated output file (text or bytes).
+
+        Files on disk are left alone if they already have these contents.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        key = self.deps.output_key(output_path)
+        if self.output_store is not None:
+            self.output_store.put(key, data)
+        elif self.writer.write(output_path, data) == UNTOUCHED:
+            self.changed_outputs.discard(key)
+            return
+        self.changed_outputs.add(key)
+        self.profiler.record_write(key, len(data))
+
+    def _build_output(self, output_path, inputs, render):
+        """Render and write an output if any of its inputs changed.
+
+        With an output store the output is only rendered once requested.
+        """
+        if not self.deps.needs_rebuild(output_path, inputs):
+            return False
+        self.changed_outputs.add(self.deps.output_key(output_path))
+        if self.output_store is not None:
+            self.output_store.defer(
+                self.deps.output_key(output_path),
+                lambda: self._render_output(output_path, inputs, render),
+            )
+        else:
+            self._render_output(output_path, inputs, render)
+        return True
+
+    def _render_output(self, output_path, inputs, render):
+        """Render and write an output, recording its inputs."""
+        start = time.perf_counter()
+        with self.deps.record(output_path, inputs):
+            text = render()
+        self.profiler.record_render(
+            self.deps.output_key(output_path), time.perf_counter() - start
+        )
+        self._write_output(output_path, text)
 
-        self.posts.sort(key=lambda x: x.pub_date, reverse=True)
-        self.content_cache.save()
+    def get_template(self, name):
+        """Look up a template once per build.
+
+        The template is recorded as an input of the output being rendered,
+        just like the templates Jinja loads for `extends` and `include`.
+        """
+        template = self.templates.get(name)
+        if template is None:
+            template = self.templates[name] = self.jinja_env.get_template(name)
+        else:
+            self.deps.add_template(name)
+        return template
+
+    def _refresh_templates(self):
+        """Forget compiled templates whose source changed since they were loaded."""
+        self.templates.clear()
+        cache = self.jinja_env.cache
+        if cache is not None:
+            for key, template in cache.items():
+                if not template.is_up_to_date:
+                    del cache[key]
+
+    def precompile_templates(self):
+        """Compile all templates into the bytecode cache."""
+        names = self.jinja_env.list_templates()
+        for name in names:
+            self.jinja_env.get_template(name)
+        print(f"Compiled {len(names)} templates")
+
+    def _render_template(self, template_name, context=None):
+        """Returns a callback that renders a template with the given context."""
+        return lambda: self.get_template(template_name).render(context or {})
+
+    def build_posts(self, posts):
+        """Build all stale posts/pages, on a process pool if `jobs` > 1.
+
+        Workers render Markdown and templates and send the HTML back, all
+        files are written here in the original order of `posts`.
+        """
+        if self.jobs <= 1 or self.output_store is not None:
+            for post in posts:
+                if self.build_post(post):
+                    print(f"Rebuilt {post.source_path}")
+            return
+
+        stale = [
+            post
+            for post in posts
+            if self.deps.needs_rebuild(
+                Path(post.output_path), self._post_inputs([post], kinds=("source",))
+            )
+        ]
+        stale_ids = {id(post) for post in stale}
+        for post in posts:
+            if id(post) not in stale_ids:
+                self._finish_post(post)
+        if not stale:
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.jobs, len(stale)),
+            initializer=_init_render_worker,
+            initargs=(self.project_folder, self.assets.manifest, self.low_memory),
+        ) as pool:
+            for batch in self._batches(stale):
+                results = pool.map(
+                    _render_post_in_worker,
+                    [self._worker_args(post) for post in batch],
+                    chunksize=max(1, len(batch) // (self.jobs * 4)),
+                )
+                for post, (html, content_data, used, highlighted, seconds) in zip(
+                    batch, results
+                ):
+                    self.highlight_cache.merge(highlighted)
+                    self._finish_rendered_post(post, html, content_data, used, seconds)
+
+    def _worker_args(self, post):
+        """Arguments of `_render_post_in_worker` for a post.
+
+        Workers have no access to the cache, so the cached rendered content
+        is passed along (e.g. if only a template changed).
+        """
+        cached = self.content_cache.get_rendered(
+            post.source_path, "content", post.content
+        )
+        return post.source_path, post.to_metadata(), cached
+
+    def _finish_rendered_post(self, post, html, content_data, used, seconds):
+        """Write a post that was rendered by a worker process."""
+        self.profiler.record_post_render(post.source_path, seconds)
+        self.profiler.record_render(
+            self.deps.output_key(Path(post.output_path)), seconds
+        )
+        inputs = self._post_inputs([post], kinds=("source",))
+        with self.deps.record(Path(post.output_path), inputs):
+            for key in used:
+                self.deps.add_input(key)
+        post.use_rendered_content(content_data)
+        self._write_output(Path(post.output_path), html)
+        self._finish_post(post)
+        print(f"Rebuilt {post.source_path}")
 
     def build_post(self, post):
-        """Build a single post/page."""
-        Path(post.output_path).parent.mkdir(parents=True, exist_ok=True)
+        """Build a single post/page if its source or templates changed."""
+
+        def render():
+            start = time.perf_counter()
+            html = self._render_post(post)
+            self.profiler.record_post_render(
+                post.source_path, time.perf_counter() - start
+            )
+            return html
+
+        inputs = self._post_inputs([post], kinds=("source",))
+        rebuilt = self._build_output(Path(post.output_path), inputs, render)
+        self._finish_post(post)
+        return rebuilt
+
+    def _finish_post(self, post):
+        """Build the files that accompany a post/page if they are stale."""
+        # Generate markdown file alongside HTML for all posts and pages
+        self.build_markdown_file(post)
+
+        # Build redirect page if this is a blog post with leading zeros needed
+        slug_with_leading_zeros = pad_date_slug(post.slug)
+        if slug_with_leading_zeros != post.slug:
+            self.build_redirect_page(post, slug_with_leading_zeros)
 
+        # Feeds load the body again if they need it
+        self._release_posts([post])
+
+    def _render_post(self, post):
+        """Render the HTML page of a single post/page."""
         content_data = post.render_content()
 
         # Add social preview image URL if available
@@ -433,33 +955,21 @@ class Builder:
             "social_image_url": social_image_url,
         }
 
-        html = self.jinja_env.get_template("content_display.html").render(context)
-
-        Path(post.output_path).write_text(html, encoding="utf-8")
-
-        # Generate markdown file alongside HTML for all posts and pages
-        self.build_markdown_file(post)
-
-        # Build redirect page if this is a blog post with leading zeros needed
-        slug_with_leading_zeros = pad_date_slug(post.slug)
-        if slug_with_leading_zeros != post.slug:
-            self.build_redirect_page(post, slug_with_leading_zeros)
-
-        # Notify that this individual page was rebuilt (triggers immediate reload)
-        if self.on_page_rebuilt:
-            self.on_page_rebuilt()
+        return self.get_template("content_display.html").render(context)
 
     def build_markdown_file(self, post):
         """Build markdown file alongside HTML."""
         html_path = Path(post.output_path)
         md_path = html_path.parent.parent / f"{html_path.parent.name}.md"
-        md_path.parent.mkdir(parents=True, exist_ok=True)
-        md_path.write_text(post.content, encoding="utf-8")
+        self._build_output(
+            md_path,
+            self._post_inputs([post], kinds=("source",)),
+            lambda: post.content,
+        )
 
     def build_redirect_page(self, post, redirect_slug):
         """Build a redirect page for the leading zero URL."""
         redirect_path = self.output_folder / redirect_slug.strip("/") / "index.html"
-        redirect_path.parent.mkdir(parents=True, exist_ok=True)
 
         canonical_url = CONFIG["site_url"].rstrip("/") + post.slug
 
@@ -471,7 +981,11 @@ class Builder:
 <script>window.location.replace('{post.slug}');</script>
 """
 
-        redirect_path.write_text(redirect_html, encoding="utf-8")
+        self._build_output(
+            redirect_path,
+            {"value:html": hash_value(redirect_html)},
+            lambda: redirect_html,
+        )
 
     def build_index_pages(self):
         """Build blog index with pagination."""
@@ -486,15 +1000,18 @@ class Builder:
 
             context = {"pagination": pagination, "show_pagination": total_pages > 1}
 
-            html = self.jinja_env.get_template("blog/index.html").render(context)
-
             if page_num == 1:
                 output_path = self.output_folder / "index.html"
             else:
                 output_path = self.output_folder / "page" / str(page_num) / "index.html"
 
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            output_path.write_text(html, encoding="utf-8")
+            inputs = self._post_inputs(pagination.get_slice())
+            inputs["value:total_pages"] = total_pages
+            self._build_output(
+                output_path, inputs, self._render_template("blog/index.html", context)
+            )
+            # Index pages render the summaries
+            self._release_posts(pagination.get_slice())
 
     def build_archive_pages(self):
         """Build archive pages."""
@@ -533,22 +1050,30 @@ class Builder:
                 }
             )
 
-        # Main archive
-        output_path = self.output_folder / "archive" / "index.html"
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        html = self.jinja_env.get_template("blog/archive.html").render(
-            {"archive": years_data}
+        # Main archive only shows the number of entries per month
+        archive_counts = [
+            (month_data["year"], month_data["month"], month_data["count"])
+            for year_data in years_data
+            for month_data in year_data["months"]
+        ]
+        self._build_output(
+            self.output_folder / "archive" / "index.html",
+            {"value:archive": hash_value(archive_counts)},
+            self._render_template("blog/archive.html", {"archive": years_data}),
         )
-        output_path.write_text(html, encoding="utf-8")
 
         # Year archives
         for year_data in years_data:
-            output_path = self.output_folder / str(year_data["year"]) / "index.html"
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            html = self.jinja_env.get_template("blog/year_archive.html").render(
-                {"entry": year_data}
+            year_posts = [
+                post
+                for month_data in year_data["months"]
+                for post in month_data["entries"]
+            ]
+            self._build_output(
+                self.output_folder / str(year_data["year"]) / "index.html",
+                self._post_inputs(year_posts),
+                self._render_template("blog/year_archive.html", {"entry": year_data}),
             )
-            output_path.write_text(html, encoding="utf-8")
 
             # Month archives
             for month_data in year_data["months"]:
@@ -558,18 +1083,21 @@ class Builder:
                     / str(month_data["month"]).lstrip("0")
                     / "index.html"
                 )
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-                html = self.jinja_env.get_template("blog/month_archive.html").render(
-                    {"entry": month_data}
+                self._build_output(
+                    output_path,
+                    self._post_inputs(month_data["entries"]),
+                    self._render_template(
+                        "blog/month_archive.html", {"entry": month_data}
+                    ),
                 )
-                output_path.write_text(html, encoding="utf-8")
 
     def build_tag_pages(self):
         """Build tag pages and tag cloud."""
-        output_path = self.output_folder / "tags" / "index.html"
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        html = self.jinja_env.get_template("tagcloud.html").render()
-        output_path.write_text(html, encoding="utf-8")
+        self._build_output(
+            self.output_folder / "tags" / "index.html",
+            {"value:tagcloud": hash_value(self._get_tags(limit=50))},
+            self._render_template("tagcloud.html"),
+        )
 
         # Individual tag pages
         for tag_name, tag_posts in self.tags.items():
@@ -577,12 +1105,13 @@ class Builder:
             tag_data = {"name": tag_name, "count": len(tag_posts)}
 
             # Tag page
-            output_path = self.output_folder / "tags" / tag_name / "index.html"
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            html = self.jinja_env.get_template("tag.html").render(
-                {"tag": tag_data, "entries": tag_posts}
+            self._build_output(
+                self.output_folder / "tags" / tag_name / "index.html",
+                self._post_inputs(tag_posts),
+                self._render_template(
+                    "tag.html", {"tag": tag_data, "entries": tag_posts}
+                ),
             )
-            output_path.write_text(html, encoding="utf-8")
 
             # Tag feed
             self._build_tag_feed(tag_name, tag_posts)
@@ -591,54 +1120,64 @@ class Builder:
         """Build Atom and RSS feeds."""
         # Main feed
         recent_posts = self.posts[:10]
+        inputs = self._post_inputs(recent_posts, kinds=("meta", "body"))
 
         # Generate Atom feed
-        atom_xml = self._generate_atom_feed(
-            title=CONFIG["site_title"],
-            feed_url=CONFIG["site_url"] + "feed.atom",
-            subtitle=CONFIG["subtitle"],
-            posts=recent_posts,
+        self._build_output(
+            self.output_folder / "feed.atom",
+            inputs,
+            lambda: self._generate_atom_feed(
+                title=CONFIG["site_title"],
+                feed_url=CONFIG["site_url"] + "feed.atom",
+                subtitle=CONFIG["subtitle"],
+                posts=recent_posts,
+            ),
         )
-        output_path = self.output_folder / "feed.atom"
-        output_path.write_text(atom_xml, encoding="utf-8")
 
         # Generate RSS feed
-        rss_xml = self._generate_rss_feed(
-            title=CONFIG["site_title"],
-            feed_url=CONFIG["site_url"] + "feed.xml",
-            subtitle=CONFIG["subtitle"],
-            posts=recent_posts,
+        self._build_output(
+            self.output_folder / "feed.xml",
+            inputs,
+            lambda: self._generate_rss_feed(
+                title=CONFIG["site_title"],
+                feed_url=CONFIG["site_url"] + "feed.xml",
+                subtitle=CONFIG["subtitle"],
+                posts=recent_posts,
+            ),
         )
-        output_path = self.output_folder / "feed.xml"
-        output_path.write_text(rss_xml, encoding="utf-8")
+        self._release_posts(recent_posts)
 
     def _build_tag_feed(self, tag_name, tag_posts):
         """Build Atom and RSS feeds for a specific tag."""
         recent_posts = sorted(
             tag_posts, key=lambda x: x.pub_date or datetime.min, reverse=True
         )[:10]
+        inputs = self._post_inputs(recent_posts, kinds=("meta", "body"))
 
         # Generate Atom feed
-        atom_xml = self._generate_atom_feed(
-            title=f"{CONFIG['site_title']} - {tag_name}",
-            feed_url=CONFIG["site_url"] + f"tags/{tag_name}/feed.atom",
-            subtitle=f"Recent blog posts tagged with '{tag_name}'",
-            posts=recent_posts,
+        self._build_output(
+            self.output_folder / "tags" / tag_name / "feed.atom",
+            inputs,
+            lambda: self._generate_atom_feed(
+                title=f"{CONFIG['site_title']} - {tag_name}",
+                feed_url=CONFIG["site_url"] + f"tags/{tag_name}/feed.atom",
+                subtitle=f"Recent blog posts tagged with '{tag_name}'",
+                posts=recent_posts,
+            ),
         )
-        output_path = self.output_folder / "tags" / tag_name / "feed.atom"
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_text(atom_xml, encoding="utf-8")
 
         # Generate RSS feed
-        rss_xml = self._generate_rss_feed(
-            title=f"{CONFIG['site_title']} - {tag_name}",
-            feed_url=CONFIG["site_url"] + f"tags/{tag_name}/feed.xml",
-            subtitle=f"Recent blog posts tagged with '{tag_name}'",
-            posts=recent_posts,
+        self._build_output(
+            self.output_folder / "tags" / tag_name / "feed.xml",
+            inputs,
+            lambda: self._generate_rss_feed(
+                title=f"{CONFIG['site_title']} - {tag_name}",
+                feed_url=CONFIG["site_url"] + f"tags/{tag_name}/feed.xml",
+                subtitle=f"Recent blog posts tagged with '{tag_name}'",
+                posts=recent_posts,
+            ),
         )
-        output_path = self.output_folder / "tags" / tag_name / "feed.xml"
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_text(rss_xml, encoding="utf-8")
+        self._release_posts(recent_posts)
 
     def _generate_atom_feed(self, title, feed_url, subtitle, posts):
         """Generate Atom feed XML."""
@@ -736,14 +1275,16 @@ class Builder:
         # Create travel page context
         context = {"travel_data": sorted_travel, "title": "Travel Schedule"}
 
-        # Render travel page
-        html = self.jinja_env.get_template("travel.html").render(context)
-
-        # Write travel page
-        output_path = self.output_folder / "travel" / "index.html"
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_text(html, encoding="utf-8")
-        print(f"Built travel/index.html")
+        # Render and write travel page
+        if self._build_output(
+            self.output_folder / "travel" / "index.html",
+            {
+                "file:events.yaml": self.deps.fingerprint("file:events.yaml"),
+                "value:today": today.isoformat(),
+            },
+            self._render_template("travel.html", context),
+        ):
+            print(f"Built travel/index.html")
 
     def build_travel_calendar(self, travel_data):
         """Build iCal calendar file from travel data."""
@@ -792,10 +1333,15 @@ class Builder:
         ical_lines.append("END:VCALENDAR")
 
         # Write calendar file
-        calendar_content = "\r\n".join(ical_lines)
-        output_path = self.output_folder / "travel.ics"
-        output_path.write_text(calendar_content, encoding="utf-8")
-        print(f"Built travel.ics")
+        if self._build_output(
+            self.output_folder / "travel.ics",
+            {
+                "file:events.yaml": self.deps.fingerprint("file:events.yaml"),
+                "value:today": today.isoformat(),
+            },
+            lambda: "\r\n".join(ical_lines),
+        ):
+            print(f"Built travel.ics")
 
     def build_talks_page(self, talks_data):
         """Build talks page from YAML data."""
@@ -819,59 +1365,147 @@ class Builder:
             "title": "Talks",
         }
 
-        # Render talks page
-        html = self.jinja_env.get_template("talks.html").render(context)
-
-        # Write talks page
-        output_path = self.output_folder / "talks" / "index.html"
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_text(html, encoding="utf-8")
-        print(f"Built talks/index.html")
+        # Render and write talks page
+        if self._build_output(
+            self.output_folder / "talks" / "index.html",
+            {
+                "file:talks.yaml": self.deps.fingerprint("file:talks.yaml"),
+                "value:today": self._get_today().isoformat(),
+            },
+            self._render_template("talks.html", context),
+        ):
+            print(f"Built talks/index.html")
+
+    def _get_pygments_css(self):
+        """Pygments CSS, remembered so that a build can skip loading the style."""
+        table = self.cache_store.table("pygments_css")
+        key = f"{CONFIG['pygments_style']}:{metadata.version('Pygments')}"
+        css = table.get(key)
+        if css is None:
+            css = get_pygments_css()
+            table.clear()
+            table[key] = css
+            table.commit()
+        return css
+
+    def scan_assets(self):
+        """Hash the static files and register their fingerprinted names."""
+        self.assets.scan({"_pygments.css": self._get_pygments_css().encode("utf-8")})
+        for name, fingerprinted in self.assets.manifest.items():
+            self.deps.set_fingerprint(f"asset:{name}", fingerprinted)
 
     def copy_static_files(self):
-        """Copy static files to output directory."""
-        static_src = self.project_folder / CONFIG["static_folder"]
-        static_dst = self.output_folder / CONFIG["static_folder"]
-
-        if not static_src.exists():
-            return
+        """Publish the static files and their fingerprinted copies.
 
-        static_dst.mkdir(parents=True, exist_ok=True)
-        for src_file in static_src.rglob("*"):
-            if src_file.is_file():
-                rel_path = src_file.relative_to(static_src)
-                dst_file = static_dst / rel_path
-                dst_file.parent.mkdir(parents=True, exist_ok=True)
-
-                # Copy if destination doesn't exist or source is newer
-                if (
-                    not dst_file.exists()
-                    or src_file.stat().st_mtime > dst_file.stat().st_mtime
-                ):
-                    shutil.copy2(src_file, dst_file)
-                    print(f"Updated {rel_path}")
+        A file is only copied if its content hash differs from the one it
+        had when it was published last, modification times don't matter.
+        """
+        static_dst = self.output_folder / CONFIG["static_folder"]
+        for name, source, data, digest in self.assets.outputs():
+            dst_file = static_dst / name
+            inputs = {"value:content": digest}
+            if not self.deps.needs_rebuild(dst_file, inputs):
+                continue
+            key = self.deps.output_key(dst_file)
+            with self.deps.record(dst_file, inputs):
+                if data is not None:
+                    self._write_output(dst_file, data)
+                elif self.output_store is not None:
+                    self.output_store.put_file(key, source)
+                    self.changed_outputs.add(key)
+                elif self.writer.copy(source, dst_file) != UNTOUCHED:
+                    self.changed_outputs.add(key)
+                    self.profiler.record_write(key, dst_file.stat().st_size)
+            if key in self.changed_outputs:
+                print(f"Updated {name}")
+
+    def precompress_outputs(self):
+        """Write gzip and brotli compressed siblings of all text outputs."""
+        compressed, up_to_date, totals = self.precompressor.run()
+        if compressed and "br" not in self.precompressor.formats:
+            print("Warning: brotli is not installed, only writing .gz files")
+        self.profiler.count("outputs_compressed", compressed)
+        self.profiler.count("outputs_compressed_up_to_date", up_to_date)
+        if compressed:
+            sizes = ", ".join(
+                f"{fmt} {totals[fmt]}" for fmt in self.precompressor.formats
+            )
+            print(
+                f"Compressed {compressed} files ({totals['raw']} bytes -> {sizes}), "
+                f"{up_to_date} were up to date"
+            )
+        self.precompressor.save()
 
-    def write_pygments_css(self):
-        """Write Pygments stylesheet."""
-        css_path = self.output_folder / CONFIG["static_folder"] / "_pygments.css"
-        css_path.parent.mkdir(parents=True, exist_ok=True)
-        css_path.write_text(get_pygments_css())
+    def output_manifest(self):
+        """Keys of all files the last full build produced in the output folder."""
+        manifest = set(self.deps.produced)
+        for post in self.posts:
+            if post.title and post.pub_date:
+                path = self.social_gen.get_social_preview_path(post)
+                manifest.add(self.deps.output_key(path))
+        if self.precompress:
+            for key in list(manifest):
+                if Path(key).suffix in COMPRESSED_SUFFIXES:
+                    manifest.update(
+                        f"{key}.{fmt}" for fmt in self.precompressor.formats
+                    )
+        return manifest
+
+    def prune_outputs(self, dry_run=False):
+        """Delete files from the output folder the current build didn't produce.
+
+        This removes the leftovers of deleted or renamed posts, tags and
+        static files.  With `dry_run` the files are only listed.
+        """
+        manifest = self.output_manifest()
+        stale = []
+        root = str(self.output_folder)
+        for dirpath, _, filenames in os.walk(root):
+            prefix = dirpath[len(root) + 1 :].replace(os.sep, "/")
+            if prefix:
+                prefix += "/"
+            for filename in filenames:
+                key = prefix + filename
+                if key not in manifest:
+                    stale.append(key)
+        stale.sort()
+        self.profiler.count("outputs_pruned", len(stale))
+
+        if dry_run:
+            for key in stale:
+                print(f"Would remove {key}")
+            print(f"Would remove {len(stale)} stale output files")
+            return stale
+
+        for key in stale:
+            path = self.output_folder / key
+            path.unlink()
+            self.deps.forget(key)
+            self.precompressor.records.pop(key, None)
+            self.social_gen.cache.pop(str(path.relative_to(self.project_folder)), None)
+            print(f"Removed {key}")
+        for key in set(self.deps.outputs.keys()) - manifest:
+            self.deps.forget(key)
+        if stale:
+            # Remove directories that became empty, deepest first
+            for dirpath, _, _ in os.walk(root, topdown=False):
+                if dirpath != root and not os.listdir(dirpath):
+                    os.rmdir(dirpath)
+            print(f"Removed {len(stale)} stale output files")
+        return stale
 
     def generate_social_previews(self):
         """Generate social media preview images for all blog posts."""
         print("Generating social preview images...")
-        generated_count = 0
-        skipped_count = 0
+        posts = [post for post in self.posts if post.title and post.pub_date]
+        generated = self.social_gen.generate_for_posts(posts, jobs=self.jobs)
+        for post in generated:
+            print(f"Generated social preview for: {post.title}")
 
-        for post in self.posts:
-            if not post.title or not post.pub_date:
-                continue
-            generated = self.social_gen.generate_for_post(post)
-            if generated:
-                generated_count += 1
-                print(f"Generated social preview for: {post.title}")
-            else:
-                skipped_count += 1
+        generated_count = len(generated)
+        skipped_count = len(posts) - generated_count
+        self.profiler.count("social_previews_generated", generated_count)
+        self.profiler.count("social_previews_up_to_date", skipped_count)
 
         if generated_count > 0:
             print(f"Generated {generated_count} social preview images")
@@ -880,89 +1514,297 @@ class Builder:
 
         self.social_gen.save_cache()
 
-    def _needs_rebuild(self, output_path, *dependency_paths):
-        """Check if output needs rebuilding based on dependency modification times."""
-        output_path = Path(output_path)
-
-        # If output doesn't exist, needs rebuild
-        if not output_path.exists():
-            return True
-
-        output_mtime = output_path.stat().st_mtime
+    def _generator_fingerprint(self):
+        """Fingerprint of the generator code and configuration.
 
-        # Check if any dependency is newer than output
-        for dep_path in dependency_paths:
-            dep_path = Path(dep_path)
-            if dep_path.exists() and dep_path.stat().st_mtime > output_mtime:
-                return True
-
-        return False
+        Every output implicitly depends on this so that changes to the
+        generator itself (markup, feeds, config) rebuild everything.  Only
+        modules that shape outputs count, templates are inputs of their own.
+        """
+        h = hashlib.sha256()
+        folder = Path(__file__).parent
+        for name in OUTPUT_MODULES:
+            h.update((folder / name).read_bytes())
+        h.update(json.dumps(CONFIG, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()
 
     def build(self):
-        """Build the site."""
-        self.scan_content()
-        travel_data = self.load_travel_data()
-        talks_data = self.load_talks_data()
-
-        content_changed = False
-        for post in self.posts + self.pages:
-            output_path = Path(post.output_path)
-            source_path = Path(post.source_path)
-            if (
-                not output_path.exists()
-                or source_path.stat().st_mtime > output_path.stat().st_mtime
-            ):
-                self.build_post(post)
-                print(f"Rebuilt {post.source_path}")
-                content_changed = True
-
-        if content_changed:
+        """Build the site, only rebuilding outputs whose inputs changed."""
+        self.profiler.reset()
+        self.deps.begin_build(
+            {
+                "value:generator": self._generator_fingerprint(),
+                "value:renderer": get_renderer_fingerprint(),
+                "value:year": datetime.now().year,
+            }
+        )
+        self.render_counts.clear()
+        self.changed_outputs.clear()
+        self.writer.reset()
+        self._refresh_templates()
+        with self.profiler.phase("scan"):
+            self.scan_content()
+            self.scan_assets()
+            travel_data = self.load_travel_data()
+            talks_data = self.load_talks_data()
+
+        with self.profiler.phase("posts"):
+            self.build_posts(self.posts + self.pages)
+
+        with self.profiler.phase("index"):
             print("Building index pages...")
             self.build_index_pages()
 
+        with self.profiler.phase("archive"):
             print("Building archive pages...")
             self.build_archive_pages()
 
+        with self.profiler.phase("tags"):
             print("Building tag pages...")
             self.build_tag_pages()
 
+        with self.profiler.phase("feeds"):
             print("Building feeds...")
             self.build_feeds()
 
-        # Build travel page and calendar with dependency tracking
-        travel_output = self.output_folder / "travel" / "index.html"
-        travel_dependencies = [
-            self.project_folder / "events.yaml",
-            Path(__file__).parent / "templates" / "travel.html",
-            Path(__file__).parent / "templates" / "layout.html",
-        ]
-
-        if self._needs_rebuild(travel_output, *travel_dependencies):
-            print("Building travel page...")
+        with self.profiler.phase("travel_talks"):
             self.build_travel_page(travel_data)
-        else:
-            print("Travel page up to date")
-
-        print("Building travel calendar...")
-        self.build_travel_calendar(travel_data)
+            self.build_travel_calendar(travel_data)
+            self.build_talks_page(talks_data)
 
-        # Build talks page with dependency tracking
-        talks_output = self.output_folder / "talks" / "index.html"
-        talks_dependencies = [
-            self.project_folder / "talks.yaml",
-            Path(__file__).parent / "templates" / "talks.html",
-            Path(__file__).parent / "templates" / "layout.html",
+        with self.profiler.phase("static"):
+            self.copy_static_files()
+
+        with self.profiler.phase("social_previews"):
+            self.generate_social_previews()
+
+        if self.prune:
+            with self.profiler.phase("prune"):
+                self.prune_outputs(dry_run=self.prune_dry_run)
+
+        if self.precompress:
+            with self.profiler.phase("compress"):
+                self.precompress_outputs()
+
+        with self.profiler.phase("save_caches"):
+            self.content_cache.save()
+            self.assets.save()
+            self.deps.save()
+            self._save_highlight_cache()
+            if self.prune and not self.prune_dry_run:
+                self.social_gen.save_cache()
+                self.precompressor.save()
+
+        self.profiler.count("outputs_rebuilt", self.deps.rebuilt)
+        self.profiler.count("outputs_up_to_date", self.deps.skipped)
+        if self.render_counts:
+            self.profiler.count("posts_rendered", len(self.render_counts))
+            print(
+                f"Rendered {len(self.render_counts)} posts, at most "
+                f"{max(self.render_counts.values())} time(s) each"
+            )
+        print(
+            f"Rebuilt {self.deps.rebuilt} outputs, {self.deps.skipped} were up to date"
+        )
+        self._report_writes()
+
+    def _save_highlight_cache(self):
+        """Count highlight cache hits and misses and save the cache."""
+        cache = self.highlight_cache
+        self.profiler.count("highlight_cache_hits", cache.hits)
+        self.profiler.count("highlight_cache_misses", cache.misses)
+        cache.hits = cache.misses = 0
+        cache.save()
+
+    def _report_writes(self):
+        """Count and print how many output files were written."""
+        if self.output_store is not None:
+            return
+        for status, n in self.writer.counts.items():
+            self.profiler.count(f"outputs_{status}", n)
+        print(f"Output files: {self.writer.summary()}")
+
+    def rebuild(self, changed_paths):
+        """Rebuild only the outputs affected by the given changed files.
+
+        Meant for the file watcher after an initial `build`.  Changed content
+        files are re-read on their own, then their pages are rebuilt and the
+        listings and feeds they appear in are checked.  Changes that can't be
+        attributed to single files (directories) and changed static files,
+        whose fingerprinted URLs are on every page, fall back to a full build.
+        """
+        if not self.deps.implicit_inputs:
+            return self.build()
+
+        start = time.perf_counter()
+        content_paths = set()
+        data_files = set()
+        for path in map(Path, changed_paths):
+            if self.should_ignore(path):
+                continue
+            rel_path = path.relative_to(self.project_folder)
+            if path.suffix == ".md":
+                content_paths.add(str(rel_path))
+            elif rel_path.parts[:1] == (CONFIG["static_folder"],):
+                return self.build()
+            elif str(rel_path) in ("events.yaml", "talks.yaml"):
+                data_files.add(str(rel_path))
+            elif path.is_dir() or any(
+                post.source_path.startswith(f"{rel_path}{os.sep}")
+                for post in self.posts + self.pages
+            ):
+                return self.build()
+
+        self.profiler.reset()
+        self.render_counts.clear()
+        self.changed_outputs.clear()
+        self.writer.reset()
+        self._refresh_templates()
+        deleted = [
+            path for path in content_paths if not (self.project_folder / path).is_file()
         ]
+        self.deps.begin_rebuild(
+            [f"file:{name}" for name in data_files]
+            + [
+                f"{kind}:{path}"
+                for path in deleted
+                for kind in ("source", "meta", "body")
+            ]
+        )
 
-        if self._needs_rebuild(talks_output, *talks_dependencies):
-            print("Building talks page...")
-            self.build_talks_page(talks_data)
-        else:
-            print("Talks page up to date")
-
-        self.copy_static_files()
-        self.write_pygments_css()
-        self.generate_social_previews()
+        with self.profiler.phase("scan"):
+            updated, listings_changed = self._reload_posts(content_paths)
+
+        with self.profiler.phase("posts"):
+            for post in updated:
+                if self.build_post(post):
+                    print(f"Rebuilt {post.source_path}")
+
+        dated_posts = [post for post in updated if post.pub_date]
+        if listings_changed:
+            with self.profiler.phase("index"):
+                self.build_index_pages()
+            with self.profiler.phase("archive"):
+                self.build_archive_pages()
+            with self.profiler.phase("tags"):
+                self.build_tag_pages()
+            with self.profiler.phase("feeds"):
+                self.build_feeds()
+            if dated_posts:
+                with self.profiler.phase("social_previews"):
+                    self.social_gen.generate_for_posts(
+                        [post for post in dated_posts if post.title]
+                    )
+                    self.social_gen.save_cache()
+        elif dated_posts:
+            # Only bodies changed, which only show up in the feeds
+            with self.profiler.phase("feeds"):
+                self.build_feeds()
+                for tag in sorted({tag for post in dated_posts for tag in post.tags}):
+                    self._build_tag_feed(tag, self.tags[tag])
+
+        if data_files:
+            with self.profiler.phase("travel_talks"):
+                if "events.yaml" in data_files:
+                    travel_data = self.load_travel_data()
+                    self.build_travel_page(travel_data)
+                    self.build_travel_calendar(travel_data)
+                if "talks.yaml" in data_files:
+                    self.build_talks_page(self.load_talks_data())
+
+        if self.precompress:
+            with self.profiler.phase("compress"):
+                self.precompress_outputs()
+
+        with self.profiler.phase("save_caches"):
+            self.content_cache.save()
+            self.deps.save()
+            self._save_highlight_cache()
+
+        self.profiler.count("outputs_rebuilt", self.deps.rebuilt)
+        self.profiler.count("outputs_up_to_date", self.deps.skipped)
+        print(
+            f"Rebuilt {self.deps.rebuilt} outputs for {len(changed_paths)} changed "
+            f"file(s) in {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+        self._report_writes()
+
+    def _reload_posts(self, rel_paths):
+        """Re-read changed content files and update the collections.
+
+        Returns the new or changed posts and whether any listing metadata
+        changed, in which case index, archive and tag pages may be stale.
+        """
+        loaded = {post.source_path: post for post in self.posts + self.pages}
+        updated = []
+        listings_changed = False
+
+        for rel_path in sorted(rel_paths):
+            filepath = self.project_folder / rel_path
+            if not filepath.is_file():
+                if loaded.pop(rel_path, None) is not None:
+                    self.content_cache.remove_file(rel_path)
+                    listings_changed = True
+                continue
+            try:
+                stat = filepath.stat()
+                if rel_path in loaded and self.content_cache.get_cached_entry(
+                    rel_path, stat
+                ):
+                    continue
+                content, post, parsed = self._load_post(rel_path, filepath)
+            except Exception as e:
+                print(f"Error processing {rel_path}: {e}")
+                continue
+            self._cache_loaded_post(rel_path, stat, content, post, parsed)
+            meta_key = f"meta:{post.source_path}"
+            old_meta = self.deps.fingerprint(meta_key) if rel_path in loaded else None
+            self._register_fingerprints(post)
+            if self.deps.fingerprint(meta_key) != old_meta:
+                listings_changed = True
+            loaded[rel_path] = post
+            updated.append(post)
+
+        if updated or listings_changed:
+            self._index_posts(loaded)
+        return updated, listings_changed
+
+
+# Builder of the current worker process when rendering with `jobs` > 1
+_worker_builder = None
+
+
+def _init_render_worker(project_folder, asset_manifest, low_memory=False):
+    """Set up a builder for a worker process of `Builder.build_posts`."""
+    global _worker_builder
+    # Only the main process reads and writes the cache database
+    _worker_builder = Builder(
+        project_folder, low_memory=low_memory, cache_store=CacheStore()
+    )
+    _worker_builder.assets.manifest = asset_manifest
+
+
+def _render_post_in_worker(args):
+    """Render a post in a worker.
+
+    Returns the HTML, the rendered content, the templates and assets it
+    used, the code blocks it highlighted and the time it took.
+    """
+    source_path, metadata, cached = args
+    builder = _worker_builder
+    post = BlogPost.from_metadata(source_path, metadata, builder)
+    if cached is not None:
+        post.use_rendered_content(cached)
+    start = time.perf_counter()
+    with builder.deps.record(Path(post.output_path), {}) as recorded:
+        html = builder._render_post(post)
+    seconds = time.perf_counter() - start
+    used = list(recorded)
+    content_data = post.render_content()
+    if builder.low_memory:
+        post.release()
+    highlighted = builder.highlight_cache.take_added()
+    return html, content_data, used, highlighted, seconds
 
 
 def pad_date_slug(slug):
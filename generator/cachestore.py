@@ -0,0 +1,276 @@
+import json
+import sqlite3
+import threading
+import zlib
+
+CACHE_STORE_VERSION = 4
+
+# Caches of earlier versions, now in the database
+LEGACY_CACHE_FILES = (
+    "content_cache.json",
+    "dependencies.json",
+    "social_preview_cache.json",
+)
+
+_MISSING = object()
+
+
+def _is_corrupt(error):
+    """Whether an error means that the database file is broken."""
+    if isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error)
+    return "not a database" in message or "malformed" in message
+
+
+class CacheStore:
+    """Persistent key/value store for everything in `.generator_cache`.
+
+    All caches of the generator live in a single SQLite database with one
+    table per cache.  Rows are only read when they are looked up and only
+    rows that changed are written back, each table commits atomically.
+    Without a project folder the store only lives in memory (for worker
+    processes, which must not touch the database of the main process).
+    """
+
+    def __init__(self, project_folder=None):
+        self.path = None
+        if project_folder is not None:
+            self.path = project_folder / ".generator_cache" / "cache.db"
+            self.path.parent.mkdir(exist_ok=True)
+            for name in LEGACY_CACHE_FILES:
+                try:
+                    (self.path.parent / name).unlink()
+                except FileNotFoundError:
+                    pass
+        self.lock = threading.RLock()
+        self.tables = {}
+        self.connection = self._connect()
+
+    def _connect(self):
+        """Open the database, starting over if it is corrupt or outdated."""
+        try:
+            connection = self._open()
+            version = connection.execute("pragma user_version").fetchone()[0]
+        except sqlite3.DatabaseError as e:
+            # Other errors (like a database locked by another process) are
+            # passed on, the cache must not be thrown away for them
+            if not _is_corrupt(e):
+                raise
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    self.path.with_name(self.path.name + suffix).unlink()
+                except FileNotFoundError:
+                    pass
+            connection = self._open()
+            version = 0
+        if version != CACHE_STORE_VERSION:
+            tables = connection.execute(
+                "select name from sqlite_master where type = 'table'"
+            ).fetchall()
+            for (name,) in tables:
+                connection.execute(f'drop table "{name}"')
+            connection.execute(f"pragma user_version = {CACHE_STORE_VERSION}")
+        return connection
+
+    def _open(self):
+        if self.path is None:
+            return sqlite3.connect(
+                ":memory:", check_same_thread=False, isolation_level=None
+            )
+        connection = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        connection.execute("pragma journal_mode = wal")
+        connection.execute("pragma synchronous = normal")
+        return connection
+
+    def table(self, name, compress=False):
+        """Get (and create if needed) the table with the given name."""
+        with self.lock:
+            rv = self.tables.get(name)
+            if rv is None:
+                self.connection.execute(
+                    f'create table if not exists "{name}" '
+                    "(key text primary key, value blob not null, "
+                    "used integer not null default 0)"
+                )
+                rv = self.tables[name] = CacheTable(self, name, compress)
+            return rv
+
+    def commit(self):
+        """Write back the changes of all tables."""
+        for table in list(self.tables.values()):
+            table.commit()
+
+
+class CacheTable:
+    """A single table of a `CacheStore` with a dict like interface.
+
+    Loaded rows are kept in memory.  Values are stored as compact JSON,
+    optionally zlib compressed.  Next to the value every row has a `used`
+    number (like a date) set with `touch`, `evict` drops the rows with the
+    lowest ones without reading any values.
+    """
+
+    def __init__(self, store, name, compress=False):
+        self.store = store
+        self.name = name
+        self.compress = compress
+        self._data = {}
+        self._changed = set()
+        self._used = {}
+        self._complete = False
+
+    def _encode(self, value):
+        data = json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+        return zlib.compress(data) if self.compress else data
+
+    def _decode(self, data):
+        if self.compress:
+            data = zlib.decompress(data)
+        return json.loads(data)
+
+    def load_all(self):
+        """Load every row into memory, further lookups won't hit the database."""
+        with self.store.lock:
+            if self._complete:
+                return
+            rows = self.store.connection.execute(
+                f'select key, value from "{self.name}"'
+            ).fetchall()
+            for key, data in rows:
+                if key not in self._data:
+                    self._data[key] = self._decode(data)
+            self._complete = True
+
+    def get(self, key, default=None):
+        """Look up a single row."""
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING and not self._complete:
+            with self.store.lock:
+                row = self.store.connection.execute(
+                    f'select value from "{self.name}" where key = ?', (key,)
+                ).fetchone()
+            value = self._decode(row[0]) if row is not None else None
+            self._data[key] = value
+        if value is _MISSING or value is None:
+            return default
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._changed.add(key)
+
+    def mark_changed(self, key):
+        """Mark a row as changed after it was modified in place."""
+        self._changed.add(key)
+
+    def touch(self, key, used):
+        """Record when a row was used, lower numbers are evicted first."""
+        self._used[key] = max(used, self._used.get(key, used))
+
+    def pop(self, key, default=None):
+        value = self.get(key, _MISSING)
+        self._data[key] = None
+        self._changed.add(key)
+        return default if value is _MISSING else value
+
+    def keys(self):
+        """Keys of all rows."""
+        self.load_all()
+        return [key for key, value in self._data.items() if value is not None]
+
+    def clear(self):
+        """Remove all rows."""
+        for key in self.keys():
+            self.pop(key)
+
+    def release(self, key):
+        """Drop a row from memory, it is read again when it is looked up.
+
+        A changed row is written back first.
+        """
+        with self.store.lock:
+            if key in self._changed:
+                self._write([key])
+                self._changed.discard(key)
+            if self._data.pop(key, None) is not None:
+                self._complete = False
+
+    def release_all(self):
+        """Drop all rows from memory, changed rows are written back first."""
+        with self.store.lock:
+            self.commit()
+            self._data.clear()
+            self._complete = False
+
+    def commit(self):
+        """Write changed rows back in a single transaction."""
+        with self.store.lock:
+            if not self._changed and not self._used:
+                return
+            self._write(self._changed, self._used)
+            self._changed.clear()
+            self._used.clear()
+
+    def evict(self, max_rows):
+        """Delete the least recently used rows beyond `max_rows`.
+
+        Changes are committed first.  Returns the number of deleted rows.
+        """
+        with self.store.lock:
+            self.commit()
+            connection = self.store.connection
+            count = connection.execute(
+                f'select count(*) from "{self.name}"'
+            ).fetchone()[0]
+            if count <= max_rows:
+                return 0
+            keys = [
+                key
+                for (key,) in connection.execute(
+                    f'select key from "{self.name}" order by used limit ?',
+                    (count - max_rows,),
+                )
+            ]
+            for key in keys:
+                self._data[key] = None
+            self._write(keys)
+            return len(keys)
+
+    def _write(self, keys, used=None):
+        # Callers hold the store lock
+        connection = self.store.connection
+        connection.execute("begin")
+        try:
+            for key in keys:
+                value = self._data.get(key)
+                if value is None:
+                    connection.execute(
+                        f'delete from "{self.name}" where key = ?', (key,)
+                    )
+                else:
+                    connection.execute(
+                        f'insert into "{self.name}" (key, value) values (?, ?) '
+                        "on conflict (key) do update set value = excluded.value",
+                        (key, self._encode(value)),
+                    )
+            if used:
+                connection.executemany(
+                    f'update "{self.name}" set used = ? where key = ? and used < ?',
+                    [(n, key, n) for key, n in used.items()],
+                )
+        except BaseException:
+            connection.execute("rollback")
+            raise
+        connection.execute("commit")
@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, only gzip files are written without it
+    brotli = None
+
+# Outputs that get precompressed siblings
+COMPRESSED_SUFFIXES = frozenset(
+    [".html", ".xml", ".atom", ".md", ".css", ".js", ".ics", ".svg", ".txt"]
+)
+
+
+def _gzip(data):
+    # No timestamp in the header so that the output is reproducible
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+COMPRESSORS = {"gz": _gzip}
+if brotli is not None:
+    COMPRESSORS["br"] = _brotli
+
+
+class Precompressor:
+    """Writes gzip (`.gz`) and brotli (`.br`) siblings of text outputs.
+
+    Files are compressed at maximum levels on a thread pool (both zlib and
+    brotli release the GIL).  The content hash of every compressed file is
+    remembered, so unchanged files are skipped even if they were rewritten.
+    """
+
+    def __init__(self, output_folder, store):
+        self.output_folder = output_folder
+        self.records = store.table("precompressed")
+        self.formats = sorted(COMPRESSORS)
+
+    def _iter_outputs(self):
+        for dirpath, _, filenames in os.walk(self.output_folder):
+            for filename in filenames:
+                path = Path(dirpath) / filename
+                if path.suffix in COMPRESSED_SUFFIXES:
+                    yield path
+
+    def _siblings_exist(self, path):
+        return all(
+            path.with_name(f"{path.name}.{fmt}").is_file() for fmt in self.formats
+        )
+
+    def _compress(self, path, entry):
+        """Compress a file if its contents changed, runs on the thread pool."""
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if (
+            entry is not None
+            and entry["hash"] == digest
+            and entry["formats"] == self.formats
+            and self._siblings_exist(path)
+        ):
+            return digest, None
+        sizes = {"raw": len(data)}
+        for fmt in self.formats:
+            compressed = COMPRESSORS[fmt](data)
+            target = path.with_name(f"{path.name}.{fmt}")
+            tmp = target.with_name(f".{target.name}.tmp")
+            tmp.write_bytes(compressed)
+            os.replace(tmp, target)
+            sizes[fmt] = len(compressed)
+        return digest, sizes
+
+    def run(self):
+        """Compress all new and changed outputs.
+
+        Returns the number of compressed files, the number of files that
+        were up to date and the total sizes per format.
+        """
+        stale = []
+        up_to_date = 0
+        for path in self._iter_outputs():
+            key = path.relative_to(self.output_folder).as_posix()
+            stat = path.stat()
+            record = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+            entry = self.records.get(key)
+            if (
+                entry is not None
+                and entry["stat"] == record
+                and entry["formats"] == self.formats
+                and self._siblings_exist(path)
+            ):
+                up_to_date += 1
+            else:
+                stale.append((key, path, record, entry))
+
+        compressed = 0
+        totals = dict.fromkeys(["raw"] + self.formats, 0)
+        with ThreadPoolExecutor() as pool:
+            futures = [
+                pool.submit(self._compress, path, entry) for _, path, _, entry in stale
+            ]
+            for (key, _, record, _), future in zip(stale, futures):
+                digest, sizes = future.result()
+                self.records[key] = {
+                    "stat": record,
+                    "hash": digest,
+                    "formats": self.formats,
+                }
+                if sizes is None:
+                    up_to_date += 1
+                    continue
+                compressed += 1
+                for name, size in sizes.items():
+                    totals[name] += size
+        return compressed, up_to_date, totals
+
+    def save(self):
+        """Write the content hashes to disk."""
+        try:
+            self.records.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not save compression cache: {e}")
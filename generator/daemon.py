@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import socket
+import sys
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+# Relative to the project folder
+SOCKET_PATH = ".generator_cache/build.sock"
+
+# Seconds a client has to send its request before it is dropped
+REQUEST_TIMEOUT = 5
+
+
+def default_socket_path(project_folder=None):
+    """Path of the socket the daemon of a project listens on."""
+    return Path(project_folder or os.getcwd()).resolve() / SOCKET_PATH
+
+
+def code_fingerprint():
+    """Hash of all generator modules, the daemon has to restart if it changes."""
+    h = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def _send(conn, message):
+    conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+class _OutputStream:
+    """File-like object that sends printed lines to the client."""
+
+    def __init__(self, conn, kind="output"):
+        self.conn = conn
+        self.kind = kind
+        self.buffer = ""
+        self.connected = True
+
+    def write(self, text):
+        self.buffer += text
+        if "\n" in self.buffer:
+            lines, _, self.buffer = self.buffer.rpartition("\n")
+            self._send(lines + "\n")
+        return len(text)
+
+    def flush(self):
+        if self.buffer:
+            self._send(self.buffer)
+            self.buffer = ""
+
+    def _send(self, text):
+        # The build goes on if the client went away
+        if self.connected:
+            try:
+                _send(self.conn, {self.kind: text})
+            except OSError:
+                self.connected = False
+
+
+class BuildDaemon:
+    """Keeps a warm builder in memory and builds when a client asks for it.
+
+    Clients connect to a Unix socket, send a JSON request line and get the
+    build output streamed back as JSON lines, followed by a final message
+    saying whether the build succeeded.  Requests are handled one after the
+    other.  Posts, compiled templates, fonts, lexers and all caches stay
+    loaded between builds, so only the stat calls and the outputs whose
+    inputs changed remain.  The daemon stops when the generator code
+    changed as it would otherwise keep running the old code.
+    """
+
+    def __init__(self, builder, socket_path=None):
+        self.builder = builder
+        self.socket_path = Path(
+            socket_path or default_socket_path(builder.project_folder)
+        )
+        self.fingerprint = code_fingerprint()
+        self.running = False
+
+    def _bind(self):
+        if self.socket_path.exists():
+            try:
+                with socket.socket(socket.AF_UNIX) as probe:
+                    probe.connect(str(self.socket_path))
+            except OSError:
+                # Left behind by a daemon that didn't shut down cleanly
+                self.socket_path.unlink()
+            else:
+                raise RuntimeError(
+                    f"A build daemon is already running at {self.socket_path}"
+                )
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        server = socket.socket(socket.AF_UNIX)
+        server.bind(str(self.socket_path))
+        server.listen()
+        return server
+
+    def serve_forever(self):
+        """Build once and then serve build requests until stopped."""
+        server = self._bind()
+        self.running = True
+        try:
+            # Clients connecting in the meantime wait for the initial build
+            with self.builder.lock:
+                self.builder.build()
+            print(f"Build daemon listening on {self.socket_path}")
+            while self.running:
+                conn, _ = server.accept()
+                with conn:
+                    self.handle(conn)
+        finally:
+            server.close()
+            self.socket_path.unlink()
+
+    def handle(self, conn):
+        """Handle a single request."""
+        # Requests are handled one at a time, a client that never sends
+        # one must not block the daemon
+        conn.settimeout(REQUEST_TIMEOUT)
+        try:
+            request = json.loads(conn.makefile("rb").readline() or "{}")
+        except ValueError:
+            request = {}
+        except OSError:
+            return
+        conn.settimeout(None)
+        command = request.get("command")
+        try:
+            if command == "build":
+                ok = self.build(conn, request.get("profile"))
+            elif command == "stop":
+                self.running = False
+                ok = True
+            else:
+                _send(conn, {"error": f"Unknown command {command!r}\n"})
+                ok = False
+            _send(conn, {"done": ok})
+        except OSError:
+            pass
+
+    def build(self, conn, profile=None):
+        """Build and stream the output, returns whether it succeeded."""
+        if code_fingerprint() != self.fingerprint:
+            _send(conn, {"error": "The generator code changed, restart the daemon\n"})
+            self.running = False
+            return False
+        stdout = _OutputStream(conn)
+        stderr = _OutputStream(conn, "error")
+        ok = True
+        with self.builder.lock, redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                self.builder.build()
+                if profile:
+                    self.builder.profiler.print_summary()
+                    self.builder.profiler.write_report(profile)
+                    print(f"Wrote build profile to {profile}")
+            except Exception:
+                traceback.print_exc()
+                ok = False
+            stdout.flush()
+            stderr.flush()
+        return ok
+
+
+def request_build(socket_path=None, command="build", profile=None):
+    """Send a request to a running daemon and print what it sends back.
+
+    Returns the exit code for the command line.
+    """
+    socket_path = Path(socket_path or default_socket_path())
+    request = {"command": command}
+    if profile:
+        request["profile"] = os.path.abspath(profile)
+    with socket.socket(socket.AF_UNIX) as conn:
+        try:
+            conn.connect(str(socket_path))
+        except OSError:
+            print(
+                f"No build daemon running at {socket_path}, "
+                "start one with build-blog --daemon",
+                file=sys.stderr,
+            )
+            return 1
+        _send(conn, request)
+        for line in conn.makefile("rb"):
+            message = json.loads(line)
+            if "output" in message:
+                sys.stdout.write(message["output"])
+                sys.stdout.flush()
+            elif "error" in message:
+                sys.stderr.write(message["error"])
+                sys.stderr.flush()
+            elif "done" in message:
+                return 0 if message["done"] else 1
+    print("The build daemon went away", file=sys.stderr)
+    return 1
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+
+from jinja2 import Environment, TemplateNotFound
+
+from generator.cachestore import CacheStore
+
+
+def hash_value(value):
+    """Stable hash for any JSON serializable value."""
+    data = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def hash_bytes(data):
+    """Hash raw bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class DependencyTrackingEnvironment(Environment):
+    """Jinja environment that reports every template it loads.
+
+    Both direct `get_template` calls and `{% extends %}` / `{% include %}`
+    go through `_load_template`, so the whole chain of templates an output
+    uses gets recorded while it renders.
+    """
+
+    dependency_graph = None
+
+    def _load_template(self, name, globals):
+        if self.dependency_graph is not None:
+            self.dependency_graph.add_template(name)
+        return super()._load_template(name, globals)
+
+
+class DependencyGraph:
+    """Records which inputs each output was built from.
+
+    Inputs are identified by keys with a prefix that says what they are:
+
+    - ``source:<path>``: the full source of a content file
+    - ``meta:<path>``: listing metadata of a post (title, summary, date, tags)
+    - ``body:<path>``: the Markdown body of a post
+    - ``template:<name>``: a Jinja template
+    - ``file:<path>``: a data file relative to the project folder
+    - ``asset:<name>``: the fingerprinted name of a static file
+    - ``value:<name>``: any other value the builder fingerprints itself
+
+    For every output the fingerprints of its inputs are stored, the ones
+    the builder passed in separately from the ones looked up while it
+    rendered.  An output is stale if it is missing, was never recorded, is
+    now built from a different set of inputs, or any of its inputs now has
+    a different fingerprint.  If the outputs live in an output store
+    instead of on disk, the records are only kept in memory as well.
+    """
+
+    def __init__(
+        self, project_folder, output_folder, environment, store=None, output_store=None
+    ):
+        self.project_folder = project_folder
+        self.output_folder = output_folder
+        self._output_prefix = str(output_folder) + os.sep
+        self.environment = environment
+        self.store = store or CacheStore(project_folder)
+        self.output_store = output_store
+        if output_store is not None:
+            self.outputs = {}
+        else:
+            self.outputs = self.store.table("dependencies")
+        self.implicit_inputs = {}
+        self.fingerprints = {}
+        self._recording = None
+        # Keys of all outputs the current build produced (built or up to date)
+        self.produced = set()
+        self.rebuilt = 0
+        self.skipped = 0
+
+    def save(self):
+        """Write changed records to disk."""
+        if self.output_store is not None:
+            return
+        try:
+            self.outputs.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not save dependency graph: {e}")
+
+    def begin_build(self, implicit_inputs):
+        """Forget fingerprints of the last build and set inputs of every output."""
+        self.implicit_inputs = dict(implicit_inputs)
+        self.fingerprints = {}
+        self.produced = set()
+        self.rebuilt = 0
+        self.skipped = 0
+
+    def begin_rebuild(self, changed_keys=()):
+        """Start a partial build, keeping all fingerprints except the changed ones."""
+        for key in changed_keys:
+            self.fingerprints.pop(key, None)
+        self.rebuilt = 0
+        self.skipped = 0
+
+    def set_fingerprint(self, key, fingerprint):
+        """Register the current fingerprint of an input."""
+        self.fingerprints[key] = fingerprint
+
+    def fingerprint(self, key):
+        """Current fingerprint of an input or `None` if it no longer exists."""
+        if key in self.fingerprints:
+            return self.fingerprints[key]
+        kind, _, name = key.partition(":")
+        rv = None
+        if kind == "template":
+            try:
+                source = self.environment.loader.get_source(self.environment, name)[0]
+                rv = hash_bytes(source.encode("utf-8"))
+            except (TemplateNotFound, OSError):
+                rv = None
+        elif kind == "file":
+            path = self.project_folder / name
+            if path.is_file():
+                rv = hash_bytes(path.read_bytes())
+        self.fingerprints[key] = rv
+        return rv
+
+    def output_key(self, output_path):
+        """Key of an output file (relative to the output folder)."""
+        # Plain string operations, this is called for every output
+        path = str(output_path)
+        if path.startswith(self._output_prefix):
+            return path[len(self._output_prefix) :].replace(os.sep, "/")
+        return output_path.relative_to(self.output_folder).as_posix()
+
+    def _output_exists(self, output_path):
+        if self.output_store is not None:
+            return self.output_key(output_path) in self.output_store
+        return output_path.exists()
+
+    def needs_rebuild(self, output_path, inputs):
+        """Check if an output is stale given the inputs it is built from."""
+        key = self.output_key(output_path)
+        self.produced.add(key)
+        recorded = self.outputs.get(key)
+        if recorded is None or not self._output_exists(output_path):
+            self.rebuilt += 1
+            return True
+
+        # A listing that only lost entries has no changed fingerprint, but
+        # its set of inputs is smaller
+        current = dict(self.implicit_inputs, **inputs)
+        if recorded["inputs"] != current or any(
+            fingerprint != self.fingerprint(input_key)
+            for input_key, fingerprint in recorded["used"].items()
+        ):
+            self.rebuilt += 1
+            return True
+
+        self.skipped += 1
+        return False
+
+    def add_template(self, name):
+        """Record a template used by the output currently being rendered."""
+        self.add_input(f"template:{name}")
+
+    def add_input(self, key):
+        """Record an input the output currently being rendered looked up."""
+        if self._recording is not None:
+            self._recording[key] = self.fingerprint(key)
+
+    @contextmanager
+    def record(self, output_path, inputs):
+        """Record the inputs of an output while it is being rendered.
+
+        Yields the inputs looked up during rendering (templates, assets).
+        """
+        self.produced.add(self.output_key(output_path))
+        self._recording = {}
+        try:
+            yield self._recording
+        except BaseException:
+            self.outputs.pop(self.output_key(output_path), None)
+            raise
+        else:
+            self.outputs[self.output_key(output_path)] = {
+                "inputs": dict(self.implicit_inputs, **inputs),
+                "used": self._recording,
+            }
+        finally:
+            self._recording = None
+
+    def forget(self, key):
+        """Drop the record of an output that is no longer produced."""
+        self.outputs.pop(key, None)
@@ -0,0 +1,315 @@
+import asyncio
+import html
+import mimetypes
+import os
+import traceback
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from generator.outputstore import RenderError
+
+HOST = "127.0.0.1"
+PORT = 5001
+
+# Seconds between keepalive comments on idle SSE connections
+KEEPALIVE_INTERVAL = 5
+
+RELOAD_SCRIPT = """
+<script>
+(function() {
+  console.log('Live reload enabled');
+  const eventSource = new EventSource(
+    '/sse?path=' + encodeURIComponent(location.pathname));
+
+  eventSource.onmessage = function(event) {
+    if (event.data === 'reload') {
+      console.log('Reloading page due to file changes...');
+      location.reload();
+    }
+  };
+
+  eventSource.onerror = function(event) {
+    console.log('Live reload connection error, retrying...');
+    setTimeout(() => location.reload(), 1000);
+  };
+})();
+</script>
+"""
+
+
+def inject_reload_script(data):
+    """Inject the live reload script into encoded HTML."""
+    script = RELOAD_SCRIPT.encode("utf-8")
+    # Inject script before closing </body> tag, or at end if no </body>
+    if b"</body>" in data:
+        return data.replace(b"</body>", script + b"</body>")
+    return data + script
+
+
+def accepted_encodings(header):
+    """Content codings an `Accept-Encoding` header allows."""
+    encodings = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        name, _, quality = params.partition("=")
+        try:
+            if name.strip() == "q" and float(quality) == 0:
+                continue
+        except ValueError:
+            pass
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+def guess_content_type(path):
+    """Content type of an output for the response header."""
+    if path.endswith(".html"):
+        return "text/html; charset=utf-8"
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+class ReloadClient:
+    """An open SSE connection of a page waiting for reloads."""
+
+    def __init__(self, path):
+        self.path = path
+        self.queue = asyncio.Queue()
+
+
+class DevServer:
+    """Development server with live reload via server-sent events.
+
+    Runs on asyncio: every open tab is a coroutine waiting on a queue that
+    only wakes up for a keepalive every few seconds.  Reloads are broadcast
+    to the tabs showing one of the changed URLs.  Files are served from
+    the output store if there is one, else from the output folder with
+    HTML getting the reload script injected and everything else sent with
+    sendfile.  With `precompressed`, outputs are served as deployed: the
+    `.br` or `.gz` sibling is sent if the client accepts it and HTML is
+    left alone.
+    """
+
+    def __init__(
+        self, directory, output_store=None, host=HOST, port=PORT, precompressed=False
+    ):
+        self.directory = Path(directory).resolve()
+        self.output_store = output_store
+        self.precompressed = precompressed
+        self.host = host
+        self.port = port
+        self.clients = set()
+        self.loop = None
+
+    def notify_reload(self, urls=None):
+        """Reload the pages showing one of `urls` (all pages if `None`).
+
+        Can be called from any thread.
+        """
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._broadcast, urls)
+
+    def _broadcast(self, urls):
+        for client in self.clients:
+            if urls is None or client.path in urls:
+                client.queue.put_nowait("reload")
+
+    def serve_forever(self):
+        """Serve until interrupted."""
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port, reuse_address=True
+        )
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        """Handle a single request, connections are not kept alive."""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            request_line = lines[0].split()
+            if len(request_line) != 3:
+                await self.send_error(writer, 400)
+                return
+            method, target, _ = request_line
+            if method not in ("GET", "HEAD"):
+                await self.send_error(writer, 405)
+                return
+            url = urlsplit(target)
+            if url.path == "/sse":
+                await self.handle_sse(writer, parse_qs(url.query))
+            else:
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                await self.handle_file(
+                    writer, unquote(url.path), method == "HEAD", headers
+                )
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_sse(self, writer, query):
+        """Keep an SSE connection open and forward reload events."""
+        client = ReloadClient(query.get("path", [None])[0])
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n"
+            b"Access-Control-Allow-Origin: *\r\n"
+            b"\r\n"
+            b"data: connected\n\n"
+        )
+        self.clients.add(client)
+        try:
+            while True:
+                await writer.drain()
+                try:
+                    message = await asyncio.wait_for(
+                        client.queue.get(), KEEPALIVE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                else:
+                    writer.write(f"data: {message}\n\n".encode())
+        finally:
+            self.clients.discard(client)
+
+    async def send_precompressed(
+        self, writer, full_path, file_path, headers, head_only
+    ):
+        """Send the compressed sibling of an output the client accepts."""
+        accepted = accepted_encodings(headers.get("accept-encoding", ""))
+        for suffix, encoding in (("br", "br"), ("gz", "gzip")):
+            compressed = full_path.with_name(f"{full_path.name}.{suffix}")
+            if encoding in accepted and compressed.is_file():
+                await self.send_file(
+                    writer,
+                    compressed,
+                    file_path,
+                    head_only,
+                    [("Content-Encoding", encoding), ("Vary", "Accept-Encoding")],
+                )
+                return
+        await self.send_file(
+            writer, full_path, file_path, head_only, [("Vary", "Accept-Encoding")]
+        )
+
+    async def handle_file(self, writer, path, head_only, headers=None):
+        """Serve an output, rendering it first if it is in the output store."""
+        file_path = path.lstrip("/")
+        if not file_path or file_path.endswith("/"):
+            file_path += "index.html"
+
+        if self.output_store is not None:
+            source = self.output_store.source_file(file_path)
+            if source is not None:
+                await self.send_file(writer, source, file_path, head_only)
+                return
+            try:
+                data = await self.loop.run_in_executor(
+                    None, self.output_store.get, file_path
+                )
+            except RenderError:
+                traceback.print_exc()
+                await self.send_error(
+                    writer, 500, f"Could not render {file_path}", head_only
+                )
+                return
+            if data is not None:
+                await self.send_data(writer, data, file_path, head_only)
+                return
+            if f"{file_path}/index.html" in self.output_store:
+                await self.send_redirect(writer, path + "/")
+                return
+
+        full_path = (self.directory / file_path).resolve()
+        if self.directory not in full_path.parents:
+            await self.send_error(writer, 404, head_only=head_only)
+        elif full_path.is_dir():
+            await self.send_redirect(writer, path + "/")
+        elif not full_path.is_file():
+            await self.send_error(writer, 404, head_only=head_only)
+        elif self.precompressed:
+            await self.send_precompressed(
+                writer, full_path, file_path, headers or {}, head_only
+            )
+        elif file_path.endswith(".html"):
+            data = inject_reload_script(full_path.read_bytes())
+            await self.send_data(writer, data, file_path, head_only)
+        else:
+            await self.send_file(writer, full_path, file_path, head_only)
+
+    def _write_head(self, writer, status, headers):
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in headers)
+        lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def send_data(self, writer, data, file_path, head_only=False):
+        """Send a complete response with the given body."""
+        self._write_head(
+            writer,
+            200,
+            [
+                ("Content-Type", guess_content_type(file_path)),
+                ("Content-Length", len(data)),
+            ],
+        )
+        if not head_only:
+            writer.write(data)
+        await writer.drain()
+
+    async def send_file(
+        self, writer, source, file_path, head_only=False, extra_headers=()
+    ):
+        """Send a file from disk with sendfile."""
+        try:
+            f = await self.loop.run_in_executor(None, open, source, "rb")
+        except OSError:
+            await self.send_error(writer, 404, head_only=head_only)
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            self._write_head(
+                writer,
+                200,
+                [
+                    ("Content-Type", guess_content_type(file_path)),
+                    ("Content-Length", size),
+                    *extra_headers,
+                ],
+            )
+            await writer.drain()
+            if not head_only and size:
+                await self.loop.sendfile(writer.transport, f)
+
+    async def send_redirect(self, writer, location):
+        self._write_head(
+            writer, 301, [("Location", quote(location)), ("Content-Length", 0)]
+        )
+        await writer.drain()
+
+    async def send_error(self, writer, status, message=None, head_only=False):
+        message = html.escape(message or HTTPStatus(status).phrase)
+        data = f"<!doctype html><title>{status}</title><h1>{message}</h1>".encode()
+        self._write_head(
+            writer,
+            status,
+            [
+                ("Content-Type", "text/html; charset=utf-8"),
+                ("Content-Length", len(data)),
+            ],
+        )
+        if not head_only:
+            writer.write(data)
+        await writer.drain()
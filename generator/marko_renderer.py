@@ -0,0 +1,61 @@
+from marko.block import Heading
+from marko.html_renderer import HTMLRenderer
+from marko.parser import Parser
+
+from generator.markup import highlight_code
+
+
+class PygmentsRenderer(HTMLRenderer):
+    """Custom Marko renderer that uses Pygments for syntax highlighting."""
+
+    def render_fenced_code(self, element):
+        """Render fenced code blocks with Pygments highlighting."""
+        code = element.children[0].children if element.children else ""
+        if isinstance(code, str):
+            language = getattr(element, "lang", None) or ""
+            return highlight_code(code, language)
+        return super().render_fenced_code(element)
+
+    @staticmethod
+    def escape_html(raw: str) -> str:
+        # For some reason quotes are always quoted here which causes issues
+        # later with smartypants.  So let's undo this.
+        return HTMLRenderer.escape_html(raw).replace("&quot;", '"')
+
+
+class TitleRenderer(PygmentsRenderer):
+    """Renderer that keeps the title of a document out of its body.
+
+    The first top-level ATX H1 is not rendered into the body but kept as
+    `title_html`, so that it can be placed separately.  This is the heading
+    `find_title_source` finds.
+    """
+
+    title_html = None
+
+    def __enter__(self):
+        self.title_html = None
+        return super().__enter__()
+
+    def render_heading(self, element):
+        """Render a heading, capturing the title of the document."""
+        if (
+            self.title_html is None
+            and isinstance(element, Heading)
+            and element.level == 1
+            and element.children
+            and any(child is element for child in self.root_node.children)
+        ):
+            self.title_html = super().render_heading(element)
+            return ""
+        return super().render_heading(element)
+
+
+class BlockParser(Parser):
+    """Parser that only parses blocks, keeping their Markdown source.
+
+    Used to find the title, which doesn't need inline elements.
+    """
+
+    def parse_inline(self, element, source):
+        pass
@@ -1,66 +1,166 @@
-from pygments import highlight
-from pygments.lexers import get_lexer_by_name, TextLexer
-from pygments.formatters import HtmlFormatter
-from pygments.styles import get_style_by_name
+import hashlib
+import json
+import re
+import sqlite3
+from datetime import date
+from functools import lru_cache
+from importlib import metadata
+
 from markupsafe import Markup
-import marko
-import smartypants
-from marko.ext.gfm import GFM
-from marko.ext import footnote
-from marko.html_renderer import HTMLRenderer
 
 from generator.config import CONFIG
 
+# marko, Pygments and smartypants are only imported once something is
+# rendered, a build with nothing to render doesn't need them.
+
+# ATX headings as marko matches them, see `find_title_source`
+_heading_re = re.compile(
+    r" {0,3}(#{1,6})((?=\s)[^\n]*?|[^\n\S]*)(?:(?<=\s)(?<!\\)#+)?[^\n\S]*$"
+)
+
+# Bump this whenever a change to the Markdown pipeline changes its output
+RENDERER_VERSION = 4
+
+# Number of highlighted code blocks the highlight cache keeps at most
+HIGHLIGHT_CACHE_SIZE = 20000
+
+# Cache used by `highlight_code`, set up by the builder
+_highlight_cache = None
+
+
+@lru_cache(maxsize=None)
+def get_lexer(language):
+    """Lexer for the language of a code block, looked up once per process.
+
+    The lookup goes through the plugin entry points, which is slower than
+    highlighting most blocks.
+    """
+    from pygments.lexers import TextLexer, get_lexer_by_name
 
-def highlight_code(code, language):
-    """Highlight code using Pygments with shared highlighting logic."""
     try:
         if language:
-            lexer = get_lexer_by_name(language)
-        else:
-            lexer = TextLexer()
+            return get_lexer_by_name(language)
     except ValueError:
-        lexer = TextLexer()
+        pass
+    return TextLexer()
+
 
-    return highlight(code, lexer, html_formatter)
+@lru_cache(maxsize=None)
+def get_pygments_version():
+    """Installed version of Pygments, looked up once per process."""
+    return metadata.version("Pygments")
 
 
-class PygmentsRenderer(HTMLRenderer):
-    """Custom Marko renderer that uses Pygments for syntax highlighting."""
+@lru_cache(maxsize=None)
+def get_html_formatter():
+    """Pygments HTML formatter for the configured style."""
+    from pygments.formatters import HtmlFormatter
+    from pygments.styles import get_style_by_name
 
-    def render_fenced_code(self, element):
-        """Render fenced code blocks with Pygments highlighting."""
-        code = element.children[0].children if element.children else ""
-        if isinstance(code, str):
-            language = getattr(element, "lang", None) or ""
-            return highlight_code(code, language)
-        return super().render_fenced_code(element)
+    return HtmlFormatter(style=get_style_by_name(CONFIG["pygments_style"]))
 
-    @staticmethod
-    def escape_html(raw: str) -> str:
-        # For some reason quotes are always quoted here which causes issues
-        # later with smartypants.  So let's undo this.
-        return HTMLRenderer.escape_html(raw).replace("&quot;", '"')
+
+def _highlight(code, language):
+    from pygments import highlight
+
+    return highlight(code, get_lexer(language), get_html_formatter())
+
+
+def highlight_code(code, language):
+    """Highlight code using Pygments with shared highlighting logic."""
+    if _highlight_cache is not None:
+        return _highlight_cache.highlight(code, language)
+    return _highlight(code, language)
+
+
+def set_highlight_cache(cache):
+    """Use a `HighlightCache` for all code blocks (or none if `None`)."""
+    global _highlight_cache
+    _highlight_cache = cache
+
+
+class HighlightCache:
+    """Persistent cache of highlighted code blocks.
+
+    Blocks are keyed by language, a hash of the code and the Pygments
+    style and version, so a post that changed only highlights its changed
+    blocks again.  Beyond `max_entries` the least recently used blocks
+    are evicted.  Use dates are kept in a column of their own, so hits
+    don't rewrite the blocks and eviction doesn't have to read them.
+    """
+
+    def __init__(self, store, max_entries=HIGHLIGHT_CACHE_SIZE):
+        self.table = store.table("highlighted_code", compress=True)
+        self.max_entries = max_entries
+        self.today = date.today().toordinal()
+        # Keys of blocks highlighted since the last `save` or `take_added`
+        self.added = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, code, language):
+        digest = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        version = get_pygments_version()
+        return f"{language}:{CONFIG['pygments_style']}:{version}:{digest}"
+
+    def highlight(self, code, language):
+        """Highlighted HTML of a code block."""
+        key = self._key(code, language)
+        html = self.table.get(key)
+        if html is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            html = _highlight(code, language)
+            self.table[key] = html
+            self.added.add(key)
+        self.table.touch(key, self.today)
+        return html
+
+    def take_added(self):
+        """Blocks highlighted since the last call, by key.
+
+        Worker processes have a cache of their own in memory and pass
+        these on to `merge` of the main process.
+        """
+        added, self.added = self.added, set()
+        return {key: self.table[key] for key in added}
+
+    def merge(self, blocks):
+        """Add blocks that were highlighted by a worker process."""
+        for key, html in blocks.items():
+            if key not in self.table:
+                self.table[key] = html
+                self.added.add(key)
+            self.table.touch(key, self.today)
+
+    def release(self):
+        """Write highlighted blocks to disk and drop them from memory."""
+        self.table.release_all()
+
+    def save(self):
+        """Write changes to disk and evict the least recently used blocks."""
+        added, self.added = self.added, set()
+        try:
+            if added:
+                self.table.evict(self.max_entries)
+            else:
+                self.table.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not save highlight cache: {e}")
 
 
 def render_markdown(content):
-    """Render Markdown content to HTML."""
-    # Remove the first heading from content since we render it separately
-    content_lines = content.split("\n")
-    filtered_lines = []
-    found_first_heading = False
-    title = None
-
-    for line in content_lines:
-        if line.strip().startswith("# ") and not found_first_heading:
-            title = line.strip()
-            found_first_heading = True
-            continue
-        filtered_lines.append(line)
-
-    filtered_content = "\n".join(filtered_lines)
-    html_content = markdown_to_html(filtered_content)
-    html_title = markdown_to_html(title) if title else None
+    """Render Markdown content to HTML, with the first heading separately.
+
+    Title and body come out of a single parse and render.
+    """
+    import smartypants
+
+    parser = get_markdown_parser(capture_title=True)
+    html_content = Markup(smartypants.smartypants(parser(content)))
+    title_html = parser.renderer.title_html
+    html_title = Markup(smartypants.smartypants(title_html)) if title_html else None
     return {
         "title": html_title.striptags() if html_title else None,
         "html_title": html_title,
@@ -75,28 +175,84 @@ def render_summary(summary):
     return markdown_to_html(summary)
 
 
-def extract_title_from_content(content):
-    """Extract title from content"""
-    # Extract title from first heading in Markdown
-    for line in content.split("\n"):
-        line = line.strip()
-        if line.startswith("# "):
-            return markdown_to_html(line[2:].strip()).striptags()
+def find_title_source(content):
+    """Markdown source of the title `render_markdown` picks or `None`.
+
+    That is the first top-level ATX heading of level one.  Almost every
+    post starts with it, which is checked on the first line without
+    parsing, anything else is looked up in the parsed document.
+    """
+    for line in content.splitlines():
+        if line.strip(" \t"):
+            match = _heading_re.match(line)
+            if match is not None and len(match.group(1)) == 1:
+                title = match.group(2).strip()
+                if title:
+                    return title
+            break
+    else:
+        return None
+
+    from marko.block import Heading
+
+    for element in get_markdown_parser(blocks_only=True).parse(content).children:
+        if isinstance(element, Heading) and element.level == 1 and element.inline_body:
+            return element.inline_body
     return None
 
 
+def render_title(source):
+    """Render the Markdown source of a title as plain text."""
+    return markdown_to_html(source).striptags()
+
+
+@lru_cache(maxsize=None)
+def get_renderer_fingerprint():
+    """Fingerprint of everything besides the source that affects rendered HTML."""
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        lexers = entry_points.select(group="pygments.lexers")
+    else:
+        lexers = entry_points.get("pygments.lexers", [])
+    data = {
+        "version": RENDERER_VERSION,
+        "pygments": get_pygments_version(),
+        "marko": metadata.version("marko"),
+        "smartypants": metadata.version("smartypants"),
+        "style": CONFIG["pygments_style"],
+        "lexers": sorted(f"{ep.name}={ep.value}" for ep in lexers),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
 def get_pygments_css():
     """Get Pygments CSS styles."""
-    return html_formatter.get_style_defs()
+    return get_html_formatter().get_style_defs()
 
 
-def markdown_to_html(content):
-    """Convert Markdown content to HTML."""
-    return Markup(smartypants.smartypants(markdown_parser(content)))
+@lru_cache(maxsize=None)
+def get_markdown_parser(capture_title=False, blocks_only=False):
+    """The Markdown parser, set up on first use.
 
+    With `capture_title` the renderer keeps the title out of the body, see
+    `TitleRenderer`.  With `blocks_only` inline elements are not parsed.
+    """
+    import marko
+    from marko.ext import footnote
+    from marko.ext.gfm import GFM
+    from marko.parser import Parser
 
-html_formatter = HtmlFormatter(style=get_style_by_name(CONFIG["pygments_style"]))
+    from generator.marko_renderer import BlockParser, PygmentsRenderer, TitleRenderer
 
-markdown_parser = marko.Markdown(
-    extensions=[GFM, footnote.make_extension()], renderer=PygmentsRenderer
-)
+    return marko.Markdown(
+        parser=BlockParser if blocks_only else Parser,
+        renderer=TitleRenderer if capture_title else PygmentsRenderer,
+        extensions=[GFM, footnote.make_extension()],
+    )
+
+
+def markdown_to_html(content):
+    """Convert Markdown content to HTML."""
+    import smartypants
+
+    return Markup(smartypants.smartypants(get_markdown_parser()(content)))
@@ -0,0 +1,76 @@
+import threading
+
+
+class RenderError(Exception):
+    """An output could not be rendered, the cause is chained."""
+
+
+class MemoryOutputStore:
+    """Keeps the outputs of a build in memory for the development server.
+
+    An output is either its encoded bytes, a callback that renders it on
+    first access, or a static file that is served from its source.  HTML
+    is passed through `transform_html` (e.g. to inject the live reload
+    script) once when it is stored, so requests just send the cached bytes.
+    """
+
+    def __init__(self, transform_html=None):
+        self.transform_html = transform_html
+        self.lock = threading.RLock()
+        self.files = {}
+        self.pending = {}
+        self.static = {}
+
+    def __contains__(self, key):
+        return key in self.files or key in self.pending or key in self.static
+
+    def put(self, key, data):
+        """Store the rendered bytes of an output."""
+        if self.transform_html is not None and key.endswith(".html"):
+            data = self.transform_html(data)
+        with self.lock:
+            self.pending.pop(key, None)
+            self.static.pop(key, None)
+            self.files[key] = data
+
+    def defer(self, key, render):
+        """Render an output on first access, `render` has to `put` it."""
+        with self.lock:
+            self.files.pop(key, None)
+            self.pending[key] = render
+
+    def put_file(self, key, path):
+        """Serve a static output from its source file."""
+        with self.lock:
+            self.files.pop(key, None)
+            self.pending.pop(key, None)
+            self.static[key] = path
+
+    def source_file(self, key):
+        """The source file of a static output or `None`."""
+        return self.static.get(key)
+
+    def get(self, key):
+        """The bytes of an output (rendered if needed) or `None`."""
+        with self.lock:
+            data = self.files.get(key)
+            if data is not None:
+                return data
+            render = self.pending.pop(key, None)
+            if render is not None:
+                try:
+                    render()
+                except Exception as e:
+                    self.pending.setdefault(key, render)
+                    raise RenderError(f"Could not render {key}") from e
+                except BaseException:
+                    self.pending.setdefault(key, render)
+                    raise
+                return self.files.get(key)
+            path = self.static.get(key)
+        if path is not None:
+            try:
+                return path.read_bytes()
+            except OSError:
+                return None
+        return None
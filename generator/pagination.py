@@ -45,7 +45,7 @@ class Pagination:
         return self.entries[(self.page - 1) * self.per_page : self.page * self.per_page]
 
     def __str__(self):
-        return self.builder.jinja_env.get_template("_pagination.html").render(
+        return self.builder.get_template("_pagination.html").render(
             {"pagination": self}
         )
 
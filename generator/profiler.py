@@ -0,0 +1,145 @@
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+def _cpu_time():
+    """CPU time of this process and its finished children (e.g. pool workers)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def get_max_rss():
+    """Peak resident set size of this process in bytes (or None)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class BuildProfiler:
+    """Collects timings and counters of a build.
+
+    The builder always reports into its profiler, it's cheap enough.  With
+    ``build-blog --profile`` the collected data is printed and written as
+    a JSON report that can be diffed between commits.
+    """
+
+    def __init__(self, slowest=20):
+        self.slowest = slowest
+        self.reset()
+
+    def reset(self):
+        """Start collecting data for a new build."""
+        self.started = time.perf_counter()
+        self.started_cpu = _cpu_time()
+        self.phases = []
+        self.counters = Counter()
+        self.render_times = {}
+        self.outputs = {}
+        self.bytes_written = 0
+        self.files_written = 0
+
+    @contextmanager
+    def phase(self, name):
+        """Measure wall and CPU time of a build phase.
+
+        The peak RSS at the end of the phase is recorded too, so it shows
+        which phase made memory use grow.
+        """
+        wall = time.perf_counter()
+        cpu = _cpu_time()
+        try:
+            yield
+        finally:
+            self.phases.append(
+                {
+                    "name": name,
+                    "wall": time.perf_counter() - wall,
+                    "cpu": _cpu_time() - cpu,
+                    "max_rss": get_max_rss(),
+                }
+            )
+
+    def count(self, name, n=1):
+        """Increment a counter (cache hits and misses and the like)."""
+        self.counters[name] += n
+
+    def record_render(self, key, seconds):
+        """Record how long it took to render an output."""
+        self.outputs.setdefault(key, {"seconds": 0.0, "bytes": 0})
+        self.outputs[key]["seconds"] += seconds
+
+    def record_post_render(self, source_path, seconds):
+        """Record how long it took to render a post's page."""
+        self.render_times[source_path] = seconds
+
+    def record_write(self, key, size):
+        """Record a file written to the output folder."""
+        self.outputs.setdefault(key, {"seconds": 0.0, "bytes": 0})
+        self.outputs[key]["bytes"] = size
+        self.bytes_written += size
+        self.files_written += 1
+
+    def report(self):
+        """The collected data as a JSON serializable dict."""
+        slowest = sorted(
+            self.outputs.items(), key=lambda x: x[1]["seconds"], reverse=True
+        )[: self.slowest]
+        return {
+            "total": {
+                "wall": time.perf_counter() - self.started,
+                "cpu": _cpu_time() - self.started_cpu,
+            },
+            "max_rss": get_max_rss(),
+            "phases": self.phases,
+            "counters": dict(sorted(self.counters.items())),
+            "files_written": self.files_written,
+            "bytes_written": self.bytes_written,
+            "post_render_times": dict(sorted(self.render_times.items())),
+            "slowest_outputs": [
+                {"path": key, "seconds": data["seconds"], "bytes": data["bytes"]}
+                for key, data in slowest
+            ],
+        }
+
+    def write_report(self, path):
+        """Write the JSON report to a file."""
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+            f.write("\n")
+
+    def print_summary(self):
+        """Print a human readable summary of the report."""
+        report = self.report()
+        print(
+            f"Build took {report['total']['wall']:.3f}s "
+            f"(cpu {report['total']['cpu']:.3f}s)"
+        )
+        for phase in report["phases"]:
+            line = (
+                f"  {phase['name']:<20} {phase['wall']:8.3f}s  cpu {phase['cpu']:.3f}s"
+            )
+            if phase["max_rss"] is not None:
+                line += f"  peak RSS {phase['max_rss'] // 1024} KiB"
+            print(line)
+        for name, value in report["counters"].items():
+            print(f"  {name:<30} {value}")
+        print(
+            f"  wrote {report['files_written']} files, {report['bytes_written']} bytes"
+        )
+        if report["max_rss"] is not None:
+            print(f"  peak RSS {report['max_rss'] // 1024} KiB")
+        if report["slowest_outputs"]:
+            print("  slowest outputs:")
+            for output in report["slowest_outputs"]:
+                print(f"    {output['seconds'] * 1000:8.1f}ms  {output['path']}")
@@ -1,17 +1,106 @@
 import hashlib
 import json
+from functools import cached_property
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont
 
+from generator.cachestore import CacheStore
 from generator.config import CONFIG
 
 SOCIAL_PREVIEW_VERSION = 6
 
+# Line widths estimated from cached word metrics that are this close to the
+# available width are measured exactly to keep line breaks pixel identical.
+LAYOUT_TOLERANCE = 4
+
+
+class TextLayout:
+    """Measures and wraps text using cached per-word metrics.
+
+    Measuring a growing line with `textbbox` for every added word is
+    quadratic in the length of the text.  Instead the ink box and the
+    advance width (including the following space) of every word are
+    measured once per font and line widths are summed up from those.
+    Words are always separated by a space so no kerning happens across
+    word boundaries.
+    """
+
+    def __init__(self):
+        from PIL import Image, ImageDraw
+
+        self._draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        self._word_metrics = {}
+
+    def _metrics(self, word, font):
+        """Returns (advance with trailing space, ink box) of a word."""
+        key = (font, word)
+        rv = self._word_metrics.get(key)
+        if rv is None:
+            advance = self._draw.textlength(word + " ", font=font)
+            bbox = self._draw.textbbox((0, 0), word, font=font)
+            rv = self._word_metrics[key] = (advance, bbox)
+        return rv
+
+    def _line_width(self, words, font):
+        """Exact width of the ink box of a line of words."""
+        bbox = self._draw.textbbox((0, 0), " ".join(words), font=font)
+        return bbox[2] - bbox[0]
+
+    def wrap(self, text, font, max_width):
+        """Wrap text to fit within max_width."""
+        if not text:
+            return []
+
+        words = text.split()
+        if not words:
+            return []
+
+        lines = []
+        current_line = []
+        # Advance of all words in the current line including their spaces
+        offset = 0.0
+        left = 0
+
+        for word in words:
+            advance, bbox = self._metrics(word, font)
+            if not current_line:
+                current_line.append(word)
+                offset = advance
+                left = bbox[0]
+                continue
+
+            width = offset + bbox[2] - left
+            if abs(width - max_width) <= LAYOUT_TOLERANCE:
+                width = self._line_width(current_line + [word], font)
+
+            if width <= max_width:
+                current_line.append(word)
+                offset += advance
+            else:
+                lines.append(" ".join(current_line))
+                current_line = [word]
+                offset = advance
+                left = bbox[0]
+
+        lines.append(" ".join(current_line))
+        return lines
+
+    def height(self, text, font):
+        """Get the height of the ink box of a line of text."""
+        boxes = [self._metrics(word, font)[1] for word in text.split()]
+        if not boxes:
+            bbox = self._draw.textbbox((0, 0), text, font=font)
+            return bbox[3] - bbox[1]
+        return max(box[3] for box in boxes) - min(box[1] for box in boxes)
+
 
 class SocialPreviewGenerator:
-    """Generate social media preview images for blog posts."""
+    """Generate social media preview images for blog posts.
 
-    def __init__(self, project_folder):
+    Pillow, the fonts and the avatar are only loaded once an image has
+    to be generated, checking whether previews are up to date is cheap.
+    """
+
+    def __init__(self, project_folder, store=None):
         self.project_folder = Path(project_folder)
         self.width = 1200
         self.height = 630
@@ -24,16 +113,14 @@ class SocialPreviewGenerator:
         self.header_color = "#96afda"  # Header color
         self.author_color = "#aec3d6"  # Faded color for author
 
-        self.fonts = self._load_fonts()
-        self.avatar = self._load_avatar()
-        self.cache_file = (
-            self.project_folder / ".generator_cache" / "social_preview_cache.json"
-        )
-        self.cache_file.parent.mkdir(exist_ok=True)
-        self.cache = self._load_cache()
+        self.store = store or CacheStore(self.project_folder)
+        self.cache = self.store.table("social_previews")
 
-    def _load_fonts(self):
+    @cached_property
+    def fonts(self):
         """Load WOFF2 fonts directly using Pillow's native support."""
+        from PIL import ImageFont
+
         fonts = {}
         fonts_dir = self.project_folder / "static" / "fonts"
 
@@ -52,8 +139,11 @@ class SocialPreviewGenerator:
 
         return fonts
 
-    def _load_avatar(self):
+    @cached_property
+    def avatar(self):
         """Load avatar image with fallback."""
+        from PIL import Image, ImageDraw
+
         avatar_path = self.project_folder / "static" / "avatar-large.jpg"
         avatar = Image.open(avatar_path)
 
@@ -67,20 +157,13 @@ class SocialPreviewGenerator:
             (self.avatar_size, self.avatar_size), Image.Resampling.BICUBIC
         )
 
-    def _load_cache(self):
-        """Load cache from disk."""
-        try:
-            if self.cache_file.exists():
-                with open(self.cache_file, "r") as f:
-                    return json.load(f)
-        except (json.JSONDecodeError, OSError):
-            pass
-        return {}
+    @cached_property
+    def layout(self):
+        return TextLayout()
 
     def save_cache(self):
-        """Save cache to disk."""
-        with open(self.cache_file, "w") as f:
-            json.dump(self.cache, f, indent=2)
+        """Write changed cache entries to disk."""
+        self.cache.commit()
 
     def _get_content_hash(self, post):
         """Generate hash for post content and metadata."""
@@ -105,42 +188,11 @@ class SocialPreviewGenerator:
 
     def _wrap_text(self, text, font, max_width):
         """Wrap text to fit within max_width."""
-        if not text:
-            return []
-
-        dummy_img = Image.new("RGB", (1, 1))
-        dummy_draw = ImageDraw.Draw(dummy_img)
-
-        words = text.split()
-        if not words:
-            return []
-
-        lines = []
-        current_line = []
-
-        for word in words:
-            test_line = " ".join(current_line + [word])
-            bbox = dummy_draw.textbbox((0, 0), test_line, font=font)
-            width = bbox[2] - bbox[0]
-
-            if width <= max_width or not current_line:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(" ".join(current_line))
-                current_line = [word]
-
-        if current_line:
-            lines.append(" ".join(current_line))
-
-        return lines
+        return self.layout.wrap(text, font, max_width)
 
     def _get_text_height(self, text, font):
         """Get the height of text."""
-        dummy_img = Image.new("RGB", (1, 1))
-        dummy_draw = ImageDraw.Draw(dummy_img)
-        bbox = dummy_draw.textbbox((0, 0), text, font=font)
-        return bbox[3] - bbox[1]
+        return self.layout.height(text, font)
 
     def _select_title_font(self, title):
         """Select appropriate title font size based on title length."""
@@ -153,6 +205,8 @@ class SocialPreviewGenerator:
 
     def _generate_preview(self, title, summary, output_path):
         """Generate a social media preview image."""
+        from PIL import Image, ImageDraw
+
         img = Image.new("RGB", (self.width, self.height), self.background_color)
         draw = ImageDraw.Draw(img)
 
@@ -247,17 +301,58 @@ class SocialPreviewGenerator:
         filename = self.get_social_preview_filename(post)
         return f"{CONFIG['site_url'].rstrip('/')}/social/{filename}"
 
-    def generate_for_post(self, post):
-        """Generate preview image for a blog post."""
-        output_path = self.get_social_preview_path(post)
-        if not self.should_regenerate(post, output_path):
-            return False
+    def generate_for_posts(self, posts, jobs=1):
+        """Generate preview images for all posts that are out of date.
+
+        With `jobs` > 1 the images are rendered on a process pool.  Every
+        worker loads the fonts and the avatar once, cache entries are only
+        updated here as the results come in.  Returns the posts for which
+        an image was generated.
+        """
+        stale = []
+        for post in posts:
+            output_path = self.get_social_preview_path(post)
+            if self.should_regenerate(post, output_path):
+                stale.append((post, output_path))
+
+        if jobs <= 1 or len(stale) <= 1:
+            for post, output_path in stale:
+                self._generate_preview(post.title, post.summary, output_path)
+                self._update_cache(post, output_path)
+            return [post for post, _ in stale]
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(stale)),
+            initializer=_init_preview_worker,
+            initargs=(self.project_folder,),
+        ) as pool:
+            results = pool.map(
+                _generate_preview_in_worker,
+                [
+                    (post.title, post.summary, output_path)
+                    for post, output_path in stale
+                ],
+            )
+            for (post, output_path), _ in zip(stale, results):
+                self._update_cache(post, output_path)
+
+        return [post for post, _ in stale]
 
-        result = self._generate_preview(
-            title=post.title, summary=post.summary, output_path=output_path
-        )
 
-        if result:
-            self._update_cache(post, output_path)
+# Generator of the current worker process for `generate_for_posts`
+_worker_generator = None
+
+
+def _init_preview_worker(project_folder):
+    """Load fonts and avatar once per worker process."""
+    global _worker_generator
+    # Cache entries are only written by the main process
+    _worker_generator = SocialPreviewGenerator(project_folder, CacheStore())
+
 
-        return True
+def _generate_preview_in_worker(args):
+    """Render a single preview image in a worker process."""
+    title, summary, output_path = args
+    return _worker_generator._generate_preview(title, summary, output_path)
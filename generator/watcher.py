@@ -5,64 +5,103 @@ from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 from generator.builder import Builder
+from generator.config import CONFIG
 
 
 class BackgroundBuilder:
-    """Simple file watcher that triggers builder.build() for any change."""
+    """File watcher that rebuilds whatever depends on the changed files.
 
-    def __init__(self, project_folder=None, debounce_delay=0.5, on_build_complete=None):
-        self.builder = Builder(project_folder)
+    Changed paths are collected until no new change came in for the
+    debounce delay and then handed to `Builder.rebuild`.  Afterwards
+    `on_build_complete` is called with the URLs of the changed pages, or
+    `None` if a static file changed and every page might look different.
+    """
+
+    def __init__(
+        self,
+        project_folder=None,
+        debounce_delay=0.03,
+        on_build_complete=None,
+        output_store=None,
+        precompress=False,
+    ):
+        self.builder = Builder(
+            project_folder, output_store=output_store, precompress=precompress
+        )
         self.debounce_delay = debounce_delay
         self.observer = Observer()
         self.last_change_time = 0
+        self.changed_paths = set()
+        self.changed = threading.Event()
         self.build_thread = None
         self.stop_event = threading.Event()
         self.build_lock = threading.Lock()
-        self.is_building = False
         self.on_build_complete = on_build_complete
-        # Pass the reload callback to the builder
-        self.builder.on_page_rebuilt = on_build_complete
 
     def _on_change(self, event):
-        """Handle any file system change."""
-        if event.is_directory or self.builder.should_ignore(event.src_path):
+        """Remember the paths of a file system change."""
+        # A directory is modified whenever a file in it changes
+        if event.is_directory and event.event_type == "modified":
             return
-        self.last_change_time = time.time()
+        paths = [
+            path
+            for path in (event.src_path, getattr(event, "dest_path", ""))
+            if path and not self.builder.should_ignore(path)
+        ]
+        if not paths:
+            return
+        with self.build_lock:
+            self.changed_paths.update(paths)
+            self.last_change_time = time.time()
+        self.changed.set()
 
-    def _build_loop(self):
-        """Background thread that triggers builds after debounce delay."""
+    def _take_changes(self):
+        """Wait for the debounce delay to pass and take the changed paths."""
         while not self.stop_event.is_set():
-            should_build = False
-
             with self.build_lock:
-                if (
-                    self.last_change_time > 0
-                    and time.time() - self.last_change_time > self.debounce_delay
-                    and not self.is_building
-                ):
-                    should_build = True
-                    self.is_building = True
-                    # Capture the change time that triggered this build
-                    build_trigger_time = self.last_change_time
+                remaining = self.last_change_time + self.debounce_delay - time.time()
+                if remaining <= 0:
+                    self.changed.clear()
+                    paths = self.changed_paths
+                    self.changed_paths = set()
+                    return paths
+            time.sleep(remaining)
+        return set()
 
-            if should_build:
-                try:
-                    self.builder.build()
-                except Exception:
-                    traceback.print_exc()
-                finally:
-                    with self.build_lock:
-                        self.is_building = False
-                        # Only reset if no new changes came in during the build
-                        if self.last_change_time == build_trigger_time:
-                            self.last_change_time = 0
+    def _build_loop(self):
+        """Background thread that rebuilds after the debounce delay."""
+        while not self.stop_event.is_set():
+            if not self.changed.wait(timeout=0.5):
+                continue
+            paths = self._take_changes()
+            if not paths:
+                continue
+            try:
+                with self.builder.lock:
+                    self.builder.rebuild(paths)
+                    urls = self._changed_urls()
+            except Exception:
+                traceback.print_exc()
+                continue
+            if self.on_build_complete and urls != set():
+                self.on_build_complete(urls)
 
-            time.sleep(0.1)
+    def _changed_urls(self):
+        """URLs of the outputs changed by the last build."""
+        urls = set()
+        for key in self.builder.changed_outputs:
+            if key.startswith(CONFIG["static_folder"] + "/"):
+                return None
+            if key == "index.html" or key.endswith("/index.html"):
+                key = key[: -len("index.html")]
+            urls.add("/" + key)
+        return urls
 
     def start(self):
         """Start watching for file changes."""
         # Initial build
-        self.builder.build()
+        with self.builder.lock:
+            self.builder.build()
 
         # Set up file watcher
         handler = FileSystemEventHandler()
@@ -83,6 +122,7 @@ class BackgroundBuilder:
     def stop(self):
         """Stop the file watcher."""
         self.stop_event.set()
+        self.changed.set()
         self.observer.stop()
         self.observer.join()
         if self.build_thread:
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+CREATED = "created"
+CHANGED = "changed"
+UNTOUCHED = "untouched"
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.digest()
+
+
+def _replace_atomically(path, write):
+    """Write a file through a temporary file next to it and a rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class OutputWriter:
+    """Writes output files only if their contents changed.
+
+    An existing file is compared by size first and by hash only if the
+    sizes match.  Unchanged files are left alone, so their modification
+    times stay the same and rsync or artifact uploads skip them.  Changed
+    files are replaced atomically, a reader never sees half a file.
+    """
+
+    def __init__(self):
+        self.counts = dict.fromkeys([CREATED, CHANGED, UNTOUCHED], 0)
+
+    def reset(self):
+        """Start counting for a new build."""
+        for status in self.counts:
+            self.counts[status] = 0
+
+    def _status(self, path, size, digest):
+        try:
+            existing_size = path.stat().st_size
+        except FileNotFoundError:
+            return CREATED
+        if existing_size == size and _file_digest(path) == digest():
+            return UNTOUCHED
+        return CHANGED
+
+    def write(self, path, data):
+        """Write bytes to `path` unless it already has them."""
+        status = self._status(path, len(data), lambda: hashlib.sha256(data).digest())
+        if status != UNTOUCHED:
+            _replace_atomically(path, lambda f: f.write(data))
+        self.counts[status] += 1
+        return status
+
+    def copy(self, source, path):
+        """Copy a file to `path` unless it already has its contents."""
+        status = self._status(path, source.stat().st_size, lambda: _file_digest(source))
+        if status != UNTOUCHED:
+
+            def write(f):
+                with open(source, "rb") as src:
+                    shutil.copyfileobj(src, f)
+
+            _replace_atomically(path, write)
+        self.counts[status] += 1
+        return status
+
+    def summary(self):
+        """A line describing what was written."""
+        return (
+            f"{self.counts[CREATED]} created, {self.counts[CHANGED]} changed, "
+            f"{self.counts[UNTOUCHED]} untouched"
+        )
@@ -0,0 +1,66 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from generator.builder import Builder
+
+BLOG_FOLDER = Path(__file__).resolve().parent.parent / "blog"
+
+POST = """\
+---
+tags: ['test']
+summary: "Post number {n}."
+---
+
+# Post {n}
+
+Body of post {n}.
+"""
+
+
+def make_project(folder, posts=23):
+    shutil.copytree(BLOG_FOLDER / "static", folder / "static")
+    for n in range(posts):
+        path = folder / "posts" / "2020" / f"01-{n + 1:02d}-post-{n}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(POST.format(n=n))
+    return folder
+
+
+def read_outputs(folder):
+    output = folder / "_build"
+    return {
+        path.relative_to(output).as_posix(): path.read_bytes()
+        for path in output.rglob("*")
+        if path.is_file() and not path.name.startswith("feed.")
+    }
+
+
+@pytest.fixture(scope="module")
+def project(tmp_path_factory):
+    return make_project(tmp_path_factory.mktemp("project"))
+
+
+def test_deleted_post_matches_clean_build(project, tmp_path):
+    folder = tmp_path / "incremental"
+    shutil.copytree(project, folder)
+    Builder(folder).build()
+    (folder / "posts" / "2020" / "01-23-post-22.md").unlink()
+    Builder(folder).build()
+
+    clean = tmp_path / "clean"
+    shutil.copytree(project, clean)
+    (clean / "posts" / "2020" / "01-23-post-22.md").unlink()
+    Builder(clean).build()
+
+    assert read_outputs(folder) == read_outputs(clean)
+
+
+def test_unchanged_build_rebuilds_nothing(project, tmp_path):
+    folder = tmp_path / "noop"
+    shutil.copytree(project, folder)
+    Builder(folder).build()
+    builder = Builder(folder)
+    builder.build()
+    assert builder.deps.rebuilt == 0
@@ -0,0 +1,30 @@
+import json
+import socket
+import time
+from types import SimpleNamespace
+
+from generator import daemon
+
+
+def make_daemon(tmp_path):
+    builder = SimpleNamespace(project_folder=tmp_path)
+    return daemon.BuildDaemon(builder, socket_path=tmp_path / "build.sock")
+
+
+def test_silent_client_times_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "REQUEST_TIMEOUT", 0.1)
+    server, client = socket.socketpair()
+    with server, client:
+        start = time.perf_counter()
+        make_daemon(tmp_path).handle(server)
+        assert time.perf_counter() - start < 2
+
+
+def test_unknown_command(tmp_path):
+    server, client = socket.socketpair()
+    with server, client:
+        client.sendall(b'{"command": "nope"}\n')
+        make_daemon(tmp_path).handle(server)
+        server.close()
+        messages = [json.loads(line) for line in client.makefile("rb")]
+    assert messages[-1] == {"done": False}
@@ -0,0 +1,47 @@
+import asyncio
+
+from generator.devserver import DevServer
+from generator.outputstore import MemoryOutputStore
+
+
+def request(server, method, path):
+    """Send a request to the dev server, returns the raw response."""
+
+    async def run():
+        server.loop = asyncio.get_running_loop()
+        tcp = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        async with tcp:
+            port = tcp.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"{method} {path} HTTP/1.1\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response
+
+    return asyncio.run(run())
+
+
+def test_send_file(tmp_path):
+    (tmp_path / "style.css").write_text("body {}")
+    response = request(DevServer(tmp_path), "GET", "/style.css")
+    assert response.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert response.endswith(b"\r\n\r\nbody {}")
+
+
+def test_head_error_has_no_body(tmp_path):
+    response = request(DevServer(tmp_path), "HEAD", "/missing.css")
+    assert response.startswith(b"HTTP/1.1 404 Not Found\r\n")
+    assert response.endswith(b"\r\n\r\n")
+    assert b"Content-Length: 0" not in response
+
+
+def test_render_error(tmp_path):
+    def render():
+        raise ValueError("broken")
+
+    store = MemoryOutputStore()
+    store.defer("index.html", render)
+    response = request(DevServer(tmp_path, store), "GET", "/")
+    assert response.startswith(b"HTTP/1.1 500 Internal Server Error\r\n")
+    assert b"Could not render index.html" in response
+    assert "index.html" in store
@@ -0,0 +1,35 @@
+import pytest
+
+from generator.markup import find_title_source, render_markdown, render_summary
+
+CASES = [
+    ("# Title\n\nBody", "Title"),
+    ("Setext\n===\n\n# Atx", "Atx"),
+    ("<div>\n# not a heading\n</div>\n\n# Real", "Real"),
+    ("<!--\n# not a heading\n-->\n\n# Real", "Real"),
+    ("<pre>\n\n# not a heading\n</pre>\n\n# Real", "Real"),
+    ("<custom-tag>\n# not a heading\n\n# Real", "Real"),
+    ("Some text\n<span>\n# Real", "Real"),
+    ("```\n# not a heading\n```\n\n# Real", "Real"),
+    ("- ```\n  # c\n  ```\n", None),
+    ("> # Quoted\n\n# Real", "Real"),
+    ("#\n\n# Real", "Real"),
+    ("  # Indented #", "Indented"),
+    ("Setext\n===\n\nNo title", None),
+]
+
+
+@pytest.mark.parametrize("source, title", CASES)
+def test_title_source_matches_render(source, title):
+    assert find_title_source(source) == title
+    assert render_markdown(source)["title"] == title
+
+
+def test_setext_heading_stays_in_body():
+    rendered = render_markdown("Setext\n===\n\n# Atx")
+    assert "<h1>Setext</h1>" in rendered["fragment"]
+    assert "Atx" not in rendered["fragment"]
+
+
+def test_summary_keeps_heading():
+    assert render_summary("# Heading summary") == "<h1>Heading summary</h1>\n"